@@ -1,6 +1,4 @@
 from collections import Counter
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
 import pandas as pd
 from arabic_reshaper import reshape
 from bidi.algorithm import get_display
@@ -10,7 +8,14 @@ import dotenv
 
 dotenv.load_dotenv()
 ARABIC_FONT_PATH = os.getenv("ARABIC_FONT_PATH")
-font_path = os.getcwd() + ARABIC_FONT_PATH
+
+
+def arabic_font_path():
+    """ARABIC_FONT_PATH resolved against the project root, or None if unset."""
+    if not ARABIC_FONT_PATH:
+        return None
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, ARABIC_FONT_PATH.lstrip("/\\"))
 
 
 def reverse_words(text):
@@ -18,6 +23,10 @@ def reverse_words(text):
 
 
 def generate_wordcloud(text):
+    # Only the word cloud needs these, and they're slow to import.
+    from wordcloud import WordCloud
+    import matplotlib.pyplot as plt
+
     reversed_text = reverse_words(text)
     reshaped_text = reshape(reversed_text)
     data = get_display(reshaped_text)
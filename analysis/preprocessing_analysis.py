@@ -1,55 +1,22 @@
-import re
 import json
 import os
+from functools import lru_cache
+from text_processing.preprocessing import normalize, normalize_stopwords
 
-current_dir = os.getcwd()
-path = os.path.join(current_dir, "analysis/stopwords.json")
-with open(path, "r", encoding="utf-8") as file:
-    stopwords = json.load(file)
+STOPWORDS_PATH = os.path.join(os.path.dirname(__file__), "stopwords.json")
 
 
-arabic_diacritics = re.compile(
-    """
-                             ّ    | # Shadda
-                            -    | # Tashdid
-                             َ    | # Fatha
-                             ً    | # Tanwin Fath
-                             ُ    | # Damma
-                             ٌ    | # Tanwin Damm
-                             ِ    | # Kasra
-                             ٍ    | # Tanwin Kasr
-                             ْ    | # Sukun
-                            ـ    | # Tatwil/Kashida
-                         """,
-    re.VERBOSE,
-)
-arabic_to_english_map = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
+@lru_cache(maxsize=None)
+def load_stopwords() -> frozenset:
+    """Read and normalize the stopword list on first use."""
+    with open(STOPWORDS_PATH, "r", encoding="utf-8") as file:
+        return normalize_stopwords(json.load(file))
 
 
 def preprocess(text):
     """
     text is an Arabic string input
 
-    the preprocessed text is returned
+    the preprocessed text is returned, without stopwords
     """
-
-    text = re.sub(r"-\s+\d+\s+-", "", text)
-    text = re.sub(r"\s+", " ", text)
-    text = re.sub(arabic_diacritics, "", text)
-    text = re.sub(
-        r"[٠١٢٣٤٥٦٧٨٩]+",  # Match Arabic numbers
-        lambda match: match.group(0)[::-1].translate(
-            arabic_to_english_map
-        ),  # Reverse and then translate
-        text,
-    )
-    text = re.sub("[إأآا]", "ا", text)
-    text = re.sub("ى", "ي", text)
-    text = re.sub("ؤ", "ء", text)
-    text = re.sub("ئ", "ء", text)
-    text = re.sub("ة", "ه", text)
-    text = re.sub("گ", "ك", text)
-
-    text = " ".join([word for word in text.split() if word not in stopwords])
-
-    return text
+    return normalize(text, stopwords=load_stopwords())
@@ -1,9 +1,11 @@
 import streamlit as st
 from design.main_ui import PDFChatbotUI
+from utils.tracing import start_metrics_export
 import os
 import dotenv
 
 dotenv.load_dotenv()
+start_metrics_export()
 
 google_api_key = os.getenv("GOOGLE_API_KEY")
 chatbot_ui = PDFChatbotUI(google_api_key)
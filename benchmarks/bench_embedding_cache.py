@@ -0,0 +1,71 @@
+"""
+Measure how much time the chunk embedding cache saves when a document is
+re-ingested and when a second document shares pages with the first.
+
+    python -m benchmarks.bench_embedding_cache --chunks 400 --overlap 0.5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import fake_embeddings, synthetic_chunks
+from text_processing.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class SlowEmbeddings:
+    """Fake embeddings that sleep per request to mimic a remote API."""
+
+    def __init__(self, latency=0.2, size=768):
+        self.model = "fake-slow"
+        self.latency = latency
+        self.embeddings = fake_embeddings(size)
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return self.embeddings.embed_query(text)
+
+
+def timed(embeddings, texts) -> float:
+    start = time.perf_counter()
+    embeddings.embed_documents(texts)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=400)
+    parser.add_argument("--overlap", type=float, default=0.5)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    first = [doc.page_content for doc in synthetic_chunks(args.chunks)]
+    shared = int(args.chunks * args.overlap)
+    second = first[:shared] + [
+        doc.page_content for doc in synthetic_chunks(args.chunks - shared, seed=10**6)
+    ]
+
+    inner = SlowEmbeddings(args.latency)
+    print(f"uncached, one request:  {timed(inner, first):.2f} s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cached = CachedEmbeddings(
+            inner,
+            cache=EmbeddingCache(os.path.join(tmp, "cache.sqlite")),
+            batch_size=args.batch_size,
+            max_concurrency=args.concurrency,
+        )
+        print(f"cold cache:             {timed(cached, first):.2f} s")
+        print(f"re-ingest same doc:     {timed(cached, first):.2f} s")
+        print(f"{args.overlap:.0%} overlapping doc:   {timed(cached, second):.2f} s")
+        print(f"hits={cached.hits} misses={cached.misses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare FAISS index types on a synthetic clustered corpus: recall@k against
+the exact flat index, query latency, build time and index size.
+
+    python -m benchmarks.bench_faiss_index_types --vectors 100000 --dim 768
+"""
+import argparse
+import time
+
+import numpy as np
+
+from text_processing.faiss_index_factory import (
+    INDEX_TYPES,
+    build_faiss_index,
+    index_size,
+    set_search_params,
+)
+
+
+def synthetic_corpus(n_vectors, dim, n_clusters=200, seed=0):
+    """Vectors drawn around random centroids, like embeddings of many topics."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n_vectors)
+    noise = rng.normal(scale=0.5, size=(n_vectors, dim)).astype(np.float32)
+    return centroids[labels] + noise
+
+
+def recall_at_k(found, truth) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=9)
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    args = parser.parse_args()
+
+    vectors = synthetic_corpus(args.vectors, args.dim)
+    queries = synthetic_corpus(args.queries, args.dim, seed=1)
+    truth = None
+
+    print(f"{args.vectors} vectors, dim {args.dim}, {args.queries} queries, k={args.k}")
+    for index_type in INDEX_TYPES:
+        start = time.perf_counter()
+        index = build_faiss_index(vectors, index_type, nlist=args.nlist)
+        index.add(vectors)
+        build_seconds = time.perf_counter() - start
+        size_mb = index_size(index) / 1024**2
+
+        if index_type == "hnsw":
+            settings = [{"ef_search": ef} for ef in args.ef_search]
+        elif index_type in ("ivf", "ivfpq"):
+            settings = [{"nprobe": nprobe} for nprobe in args.nprobe]
+        else:
+            settings = [{}]
+
+        for params in settings:
+            set_search_params(index, **params)
+            start = time.perf_counter()
+            _, found = index.search(queries, args.k)
+            latency_ms = (time.perf_counter() - start) * 1000 / args.queries
+            if truth is None:
+                truth = found
+            label = " ".join(f"{key}={value}" for key, value in params.items())
+            print(
+                f"{index_type:<6} {label:<14} recall@{args.k}={recall_at_k(found, truth):.3f}  "
+                f"{latency_ms:7.3f} ms/query  build {build_seconds:6.1f} s  "
+                f"{size_mb:8.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare cold loads of the pickled FAISS format against the memory-mapped one:
+load time, memory added by the load and the first search, each in a fresh
+process. Resident memory includes mapped index pages, which processes share
+through the page cache; private memory is what each process holds on its own.
+
+    python -m benchmarks.bench_index_loading --chunks 20000
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.fakes import fake_embeddings, synthetic_chunks
+from text_processing.mapped_index import load_mapped_index, save_mapped_index
+
+
+def memory_bytes() -> tuple[int, int]:
+    """Resident and private (anonymous) memory of this process (Linux)."""
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            fields[name] = value
+    return tuple(int(fields[name].split()[0]) * 1024 for name in ("VmRSS", "RssAnon"))
+
+
+def cold_load(index_format, index_path) -> tuple[float, float, int, int]:
+    """
+    Return (load seconds, first search seconds, resident bytes and private
+    bytes added by both).
+    """
+    embeddings = fake_embeddings()
+    rss_before, private_before = memory_bytes()
+    start = time.perf_counter()
+    if index_format == "pickle":
+        vector_store = FAISS.load_local(
+            index_path, embeddings, allow_dangerous_deserialization=True
+        )
+    else:
+        vector_store = load_mapped_index(index_path, embeddings)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vector_store.similarity_search("الدستور والقانون", k=9)
+    search_seconds = time.perf_counter() - start
+    rss, private = memory_bytes()
+    return load_seconds, search_seconds, rss - rss_before, private - private_before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as index_path:
+        vector_store = FAISS.from_documents(
+            synthetic_chunks(args.chunks), embedding=fake_embeddings()
+        )
+        vector_store.save_local(index_path)
+        save_mapped_index(vector_store, index_path)
+        del vector_store
+
+        print(f"{args.chunks} chunks")
+        context = multiprocessing.get_context("spawn")
+        for index_format in ("pickle", "mapped"):
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                load, search, rss, private = executor.submit(
+                    cold_load, index_format, index_path
+                ).result()
+            print(
+                f"{index_format:<7} load={load * 1000:8.2f} ms  "
+                f"first search={search * 1000:8.2f} ms  "
+                f"rss+={rss / 2**20:8.1f} MB  private+={private / 2**20:8.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Compare serial and process-pool extraction + OCR of a PDF and print the
+slowest pages.
+
+    python -m benchmarks.bench_parallel_ocr temp/test.pdf --workers 4
+"""
+import argparse
+import time
+
+from pdf_processing.pdf_extractor import PDFExtractor
+from text_processing.text_formatter import TextFormatter
+
+
+def run(pdf_path, workers) -> TextFormatter:
+    pages = PDFExtractor(pdf_path, workers=workers)
+    formatter = TextFormatter(pages.iter_pages(), workers=workers)
+    formatter.format_extracted_data()
+    return formatter
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdf_path")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--slowest", type=int, default=5)
+    args = parser.parse_args()
+
+    for workers in sorted({1, args.workers}):
+        start = time.perf_counter()
+        formatter = run(args.pdf_path, workers)
+        elapsed = time.perf_counter() - start
+        print(f"workers={workers:<3} {elapsed:8.2f} s  ({len(formatter.page_timings)} pages)")
+
+    slowest = sorted(
+        formatter.page_timings,
+        key=lambda t: t["extract_seconds"] + t["ocr_seconds"],
+        reverse=True,
+    )
+    for timing in slowest[: args.slowest]:
+        print(
+            f"  page {timing['page']:>4}: extract {timing['extract_seconds']:.3f} s, "
+            f"ocr {timing['ocr_seconds']:.3f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
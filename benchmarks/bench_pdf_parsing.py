@@ -0,0 +1,66 @@
+"""
+Compare the old extraction, which parsed every PDF three times (spire for
+images, PyPDF2 for text and PyPDFLoader for chunking), with the single-pass
+PDFExtractor stream feeding both TextFormatter and EmbeddingHandler. The
+old pipeline's libraries are no longer requirements; it's skipped unless
+they're installed with `pip install Spire.Pdf==10.1.1 PyPDF2==3.0.1`.
+
+    python -m benchmarks.bench_pdf_parsing temp/test.pdf
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import fake_embeddings
+from pdf_processing.pdf_extractor import PDFExtractor
+from text_processing.embedding_handler import EmbeddingHandler
+
+
+def triple_parse(pdf_path, output_directory) -> int:
+    from spire.pdf import PdfDocument, PdfImageHelper
+    from PyPDF2 import PdfReader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_community.document_loaders import PyPDFLoader
+
+    doc = PdfDocument()
+    doc.LoadFromFile(pdf_path)
+    pdf_reader = PdfReader(pdf_path)
+    image_helper = PdfImageHelper()
+    for i in range(doc.Pages.Count):
+        images_info = image_helper.GetImagesInfo(doc.Pages.get_Item(i))
+        pdf_reader.pages[i].extract_text()
+        for j, image_info in enumerate(images_info):
+            image_info.Image.Save(os.path.join(output_directory, f"Image-{i}-{j}.png"))
+    doc.Close()
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1200, chunk_overlap=40)
+    return len(PyPDFLoader(pdf_path).load_and_split(text_splitter))
+
+
+def single_pass(pdf_path, output_directory) -> int:
+    # Images stay in memory; output_directory is only used by the old path.
+    pages = PDFExtractor(pdf_path).extract_images_and_text()
+    handler = EmbeddingHandler(fake_embeddings())
+    return len(handler.get_text_chunks(pdf_path, pages=pages))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdf_path")
+    args = parser.parse_args()
+
+    for name, run in [("triple", triple_parse), ("single", single_pass)]:
+        with tempfile.TemporaryDirectory() as output_directory:
+            try:
+                start = time.perf_counter()
+                n_chunks = run(args.pdf_path, output_directory)
+                elapsed = time.perf_counter() - start
+            except ImportError as e:
+                print(f"{name:<8} skipped: {e}")
+                continue
+            print(f"{name:<8} {elapsed:8.2f} s  ({n_chunks} chunks)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+End-to-end benchmark of the ingest and query pipeline on a synthetic Arabic
+PDF, fully offline: fake embeddings, a fake LLM and a generated PDF. Reports
+throughput, p50/p95 latency, the change in resident memory over each stage
+and the process's peak RSS so far, and writes them as JSON so runs can be
+compared.
+
+    python -m benchmarks.bench_pipeline --pages 50 --images-per-page 1 \
+        --output bench_output.json --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import (
+    fake_embeddings,
+    fake_llm,
+    synthetic_chunks,
+    write_synthetic_pdf,
+)
+from chatbot.qa_chain import QAChain
+from chatbot.vector_store_cache import vector_store_cache
+from pdf_processing.pdf_extractor import PDFExtractor
+from text_processing.bm25_index import BM25Index
+from text_processing.embedding_handler import EmbeddingHandler
+from text_processing.preprocessing import preprocess
+
+
+def rss_mb():
+    """Current resident set size of this process, or None off Linux."""
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as f:
+            resident_pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, across all stages."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def percentile(values, q) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def stage_result(unit, count, seconds, rss_before, latencies=()) -> dict:
+    """
+    Throughput in unit/s, latency percentiles in ms, the RSS change since
+    rss_before and the process's cumulative peak RSS after a stage.
+    """
+    rss_after = rss_mb()
+    result = {
+        "unit": unit,
+        "count": count,
+        "seconds": seconds,
+        "throughput": count / seconds if seconds else 0.0,
+        "rss_delta_mb": (
+            rss_after - rss_before if None not in (rss_before, rss_after) else None
+        ),
+        "process_peak_rss_mb": peak_rss_mb(),
+    }
+    latencies = [latency for latency in latencies if latency is not None]
+    if latencies:
+        result["p50_ms"] = statistics.median(latencies) * 1000
+        result["p95_ms"] = percentile(latencies, 95) * 1000
+    return result
+
+
+def timed(fn, items) -> tuple[list, list[float]]:
+    """Call fn on every item, returning the results and each call's latency."""
+    results, latencies = [], []
+    for item in items:
+        start = time.perf_counter()
+        results.append(fn(item))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def run(args, pdf_path) -> dict:
+    stages = {}
+    embeddings = fake_embeddings()
+
+    rss_before, start = rss_mb(), time.perf_counter()
+    pages = PDFExtractor(pdf_path).extract_images_and_text()
+    stages["extract"] = stage_result(
+        "pages",
+        len(pages),
+        time.perf_counter() - start,
+        rss_before,
+        [page.elapsed for page in pages],
+    )
+
+    if not args.skip_ocr:
+        # Imported here, since it needs OpenCV and tesseract.
+        from text_processing.text_formatter import TextFormatter
+
+        formatter = TextFormatter(pages, workers=args.workers)
+        rss_before, start = rss_mb(), time.perf_counter()
+        formatter.format_extracted_data()
+        stages["format_ocr"] = stage_result(
+            "pages",
+            len(pages),
+            time.perf_counter() - start,
+            rss_before,
+            [timing["ocr_seconds"] for timing in formatter.page_timings],
+        )
+
+    texts = [page.text for page in pages]
+    rss_before, start = rss_mb(), time.perf_counter()
+    _, latencies = timed(preprocess, texts)
+    stages["preprocess"] = stage_result(
+        "pages", len(texts), time.perf_counter() - start, rss_before, latencies
+    )
+
+    embedding_handler = EmbeddingHandler(embeddings)
+    rss_before, start = rss_mb(), time.perf_counter()
+    text_chunks = embedding_handler.get_text_chunks(pdf_path)
+    stages["chunk"] = stage_result(
+        "chunks", len(text_chunks), time.perf_counter() - start, rss_before
+    )
+    if not text_chunks:
+        sys.exit(
+            f"No text could be extracted from {pdf_path}, so there is nothing "
+            "to embed and query. Use a PDF with a text layer."
+        )
+
+    rss_before, start = rss_mb(), time.perf_counter()
+    vector_store = embedding_handler.get_vector_store(text_chunks, index_path=None)
+    stages["embed_index"] = stage_result(
+        "chunks", len(text_chunks), time.perf_counter() - start, rss_before
+    )
+
+    bm25 = BM25Index()
+    bm25.add_documents(text_chunks)
+    index_path = os.path.join(tempfile.gettempdir(), "bench_pipeline_index")
+    vector_store_cache.put(index_path, vector_store)
+    qa_chain = QAChain(embeddings, index_path=index_path, llm=fake_llm(), bm25=bm25)
+    questions = [
+        doc.page_content[:80] for doc in synthetic_chunks(args.questions, seed=10**6)
+    ]
+    rss_before, start = rss_mb(), time.perf_counter()
+    _, latencies = timed(lambda q: qa_chain.answer_question(q, None), questions)
+    stages["answer"] = stage_result(
+        "queries", len(questions), time.perf_counter() - start, rss_before, latencies
+    )
+    vector_store_cache.discard(index_path)
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--images-per-page", type=int, default=0)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--skip-ocr", action="store_true", help="skip TextFormatter (needs tesseract)"
+    )
+    parser.add_argument("--pdf", help="benchmark this PDF instead of a synthetic one")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = args.pdf or write_synthetic_pdf(
+            os.path.join(tmp_dir, "synthetic.pdf"),
+            args.pages,
+            images_per_page=args.images_per_page,
+        )
+        stages = run(args, pdf_path)
+
+    for name, stage in stages.items():
+        latency = (
+            f"p50={stage['p50_ms']:8.2f} ms  p95={stage['p95_ms']:8.2f} ms  "
+            if "p50_ms" in stage
+            else " " * 34
+        )
+        rss_delta = (
+            f"{stage['rss_delta_mb']:+8.1f} MB"
+            if stage["rss_delta_mb"] is not None
+            else "     n/a"
+        )
+        print(
+            f"{name:<12} {stage['throughput']:10.1f} {stage['unit']}/s  "
+            f"{latency}rss change={rss_delta}  "
+            f"process peak rss={stage['process_peak_rss_mb']:8.1f} MB"
+        )
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["stages"]
+        print(f"throughput relative to {args.compare}:")
+        for name, stage in stages.items():
+            if baseline.get(name, {}).get("throughput"):
+                ratio = stage["throughput"] / baseline[name]["throughput"]
+                print(f"  {name:<12} x{ratio:.2f}")
+
+    if args.output:
+        results = {
+            "config": vars(args),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "stages": stages,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
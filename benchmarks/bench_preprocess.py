@@ -0,0 +1,87 @@
+"""
+Check that preprocess matches the original multi-pass implementation on
+randomly generated text, then time both on a large Arabic corpus.
+
+    python -m benchmarks.bench_preprocess --words 500000 --cases 100000
+"""
+import argparse
+import random
+import re
+import time
+
+from benchmarks.fakes import synthetic_text
+from text_processing.preprocessing import preprocess
+
+legacy_diacritics = re.compile("[ًٌٍَُِّْـ-]")
+legacy_digits_map = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
+
+
+def legacy_preprocess(text):
+    """The original implementation: one re.sub pass per rule."""
+    text = re.sub(r"-\s+\d+\s+-", "", text)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(legacy_diacritics, "", text)
+    text = re.sub(
+        r"[٠١٢٣٤٥٦٧٨٩]+",
+        lambda match: match.group(0)[::-1].translate(legacy_digits_map),
+        text,
+    )
+    text = re.sub("[إأآا]", "ا", text)
+    text = re.sub("ى", "ي", text)
+    text = re.sub("ؤ", "ء", text)
+    text = re.sub("ئ", "ء", text)
+    text = re.sub("ة", "ه", text)
+    text = re.sub("گ", "ك", text)
+    return text
+
+
+# Every character any rule touches, plus some that none do.
+ALPHABET = list("ًٌٍَُِّْـ-إأآاىيؤئءةهگك٠١٢٣٤٥٦٧٨٩0123456789 \t\n بتمن.")
+
+
+def check_equivalence(cases, seed=0) -> None:
+    rng = random.Random(seed)
+    for _ in range(cases):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+        expected = legacy_preprocess(text)
+        actual = preprocess(text)
+        assert actual == expected, f"{text!r}: {actual!r} != {expected!r}"
+
+
+def corpus(n_words, seed=0) -> str:
+    """Synthetic Arabic text with diacritics, digits and page markers mixed in."""
+    rng = random.Random(seed)
+    words = synthetic_text(n_words, seed).split()
+    for i in range(0, len(words), 50):
+        words[i] = rng.choice(["مُحَمَّدٌ", "٢٠١٩", "- ١٢ -", "إلى", "مسؤولية", "الـدولة"])
+    return " ".join(words)
+
+
+def best_of(fn, text, repeat=5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=500_000)
+    parser.add_argument("--cases", type=int, default=100_000)
+    args = parser.parse_args()
+
+    check_equivalence(args.cases)
+    print(f"outputs identical on {args.cases} random inputs")
+
+    text = corpus(args.words)
+    assert preprocess(text) == legacy_preprocess(text)
+    legacy = best_of(legacy_preprocess, text)
+    current = best_of(preprocess, text)
+    print(f"legacy  {legacy * 1000:8.1f} ms")
+    print(f"current {current * 1000:8.1f} ms  ({legacy / current:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
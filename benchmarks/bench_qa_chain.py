@@ -0,0 +1,77 @@
+"""
+Compare per-question latency of QAChain against the old path that reloaded the
+FAISS index and rebuilt the retrieval chain on every question.
+
+    python -m benchmarks.bench_qa_chain --chunks 5000 --questions 20
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+from langchain.chains import create_retrieval_chain
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.fakes import fake_embeddings, fake_llm, synthetic_chunks
+from chatbot.qa_chain import QAChain
+from text_processing.preprocessing import preprocess
+from text_processing.mapped_index import save_mapped_index
+
+
+def time_questions(answer, questions) -> list[float]:
+    timings = []
+    for question in questions:
+        start = time.perf_counter()
+        answer(question)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name, timings) -> None:
+    print(
+        f"{name:<10} mean={statistics.mean(timings) * 1000:8.2f} ms  "
+        f"p50={statistics.median(timings) * 1000:8.2f} ms  "
+        f"max={max(timings) * 1000:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=20)
+    args = parser.parse_args()
+
+    embeddings = fake_embeddings()
+    questions = [f"ما هو موضوع الماده رقم {i}؟" for i in range(args.questions)]
+
+    with tempfile.TemporaryDirectory() as index_path:
+        vector_store = FAISS.from_documents(
+            synthetic_chunks(args.chunks), embedding=embeddings
+        )
+        # The old pickled format for the baseline, the mapped one for QAChain.
+        vector_store.save_local(index_path)
+        save_mapped_index(vector_store, index_path)
+        qa_chain = QAChain(
+            embeddings, index_path=index_path, llm=fake_llm(), retrieval_mode="vector"
+        )
+
+        def reload_every_time(question):
+            db_vector = FAISS.load_local(
+                index_path, embeddings, allow_dangerous_deserialization=True
+            )
+            retriever = db_vector.as_retriever(search_kwargs={"k": 9})
+            chain = create_retrieval_chain(retriever, qa_chain.chain)
+            return chain.invoke({"input": preprocess(question)})
+
+        def resident(question):
+            query = preprocess(question)
+            context, _ = qa_chain.retrieve(query)
+            return qa_chain.chain.invoke({"input": query, "context": context})
+
+        print(f"{args.chunks} chunks, {args.questions} questions")
+        report("reload", time_questions(reload_every_time, questions))
+        report("resident", time_questions(resident, questions))
+
+
+if __name__ == "__main__":
+    main()
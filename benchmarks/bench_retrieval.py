@@ -0,0 +1,87 @@
+"""
+Compare lexical (BM25), vector and hybrid retrieval latency, with a fake
+embedding service that takes --latency seconds per query. Chunks draw their
+words from a Zipf-distributed vocabulary of --vocabulary words; 0 uses the 20
+words of synthetic_chunks, which all occur in every chunk.
+
+    python -m benchmarks.bench_retrieval --chunks 5000 --latency 0.3
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.fakes import (
+    fake_embeddings,
+    fake_llm,
+    synthetic_chunks,
+    zipf_chunks,
+)
+from chatbot.qa_chain import QAChain
+from chatbot.vector_store_cache import vector_store_cache
+from text_processing.bm25_index import BM25Index
+from text_processing.preprocessing import preprocess
+
+
+class SlowQueryEmbeddings:
+    """Fake embeddings whose queries take a fixed time, like a remote API."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.embeddings = fake_embeddings()
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return self.embeddings.embed_query(text)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    args = parser.parse_args()
+
+    embeddings = SlowQueryEmbeddings(args.latency)
+    if args.vocabulary:
+        text_chunks = zipf_chunks(args.chunks, args.vocabulary)
+        question_chunks = zipf_chunks(
+            args.questions, args.vocabulary, words_per_chunk=12, seed=10**6
+        )
+    else:
+        text_chunks = synthetic_chunks(args.chunks)
+        question_chunks = synthetic_chunks(args.questions, seed=10**6)
+    bm25 = BM25Index()
+    bm25.add_documents(text_chunks)
+    questions = [preprocess(doc.page_content[:60]) for doc in question_chunks]
+
+    with tempfile.TemporaryDirectory() as index_path:
+        vector_store = FAISS.from_documents(text_chunks, embedding=embeddings)
+        vector_store_cache.put(index_path, vector_store)
+        for mode in ["lexical", "vector", "hybrid"]:
+            qa_chain = QAChain(
+                embeddings,
+                index_path=index_path,
+                llm=fake_llm(),
+                bm25=bm25,
+                retrieval_mode=mode,
+            )
+            timings = []
+            for question in questions:
+                start = time.perf_counter()
+                qa_chain.retrieve(question)
+                timings.append(time.perf_counter() - start)
+            print(
+                f"{mode:<8} p50={statistics.median(timings) * 1000:8.3f} ms  "
+                f"max={max(timings) * 1000:8.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
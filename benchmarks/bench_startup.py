@@ -0,0 +1,96 @@
+"""
+Profile the imports `streamlit run app.py` needs before the landing page
+renders, with `python -X importtime` in a fresh interpreter. Exits non-zero
+if they take longer than --threshold milliseconds, or if a heavy dependency
+that only some pages need is imported at startup.
+
+    python -m benchmarks.bench_startup --threshold 1500 --runs 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+# What app.py imports before rendering the About page.
+STARTUP_MODULES = ["dotenv", "streamlit", "design.main_ui"]
+# Dependencies that must only load with the page or pipeline that uses them.
+LAZY_MODULES = [
+    "langchain",
+    "langchain_community",
+    "langchain_google_genai",
+    "faiss",
+    "google.generativeai",
+    "IPython",
+    "matplotlib",
+    "wordcloud",
+    "pandas",
+    "cv2",
+    "pytesseract",
+    "spire",
+    "sounddevice",
+]
+
+
+def import_times(modules) -> dict:
+    """
+    Return {module: (self us, cumulative us, nesting depth)} for one cold
+    import of modules.
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=float, default=1500.0, help="ms")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        times = import_times(STARTUP_MODULES)
+        # -X importtime nests imports; the top-level ones add up to the total.
+        totals.append(
+            sum(cumulative for _, cumulative, depth in times.values() if depth == 0)
+            / 1000
+        )
+
+    print(f"startup imports over {args.runs} runs:")
+    print(f"  median={statistics.median(totals):8.1f} ms  max={max(totals):8.1f} ms")
+    print("slowest imports (cumulative, last run):")
+    for name, (_, cumulative, _) in sorted(
+        times.items(), key=lambda item: item[1][1], reverse=True
+    )[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    # Only count what the app pulls in, not what streamlit imports itself.
+    baseline = import_times(STARTUP_MODULES[:-1])
+    eager = [
+        module for module in LAZY_MODULES if module in times and module not in baseline
+    ]
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(eager)}")
+        failed = True
+    if statistics.median(totals) > args.threshold:
+        print(f"FAIL: median above the {args.threshold:.0f} ms threshold")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Measure time to first token of QAChain.stream_answer against the time to the
+whole answer, and how astream_answer serves concurrent chats, with a fake LLM
+that takes --token-delay seconds per character.
+
+    python -m benchmarks.bench_streaming --questions 10 --concurrency 20
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.fakes import fake_embeddings, fake_llm, synthetic_chunks
+from chatbot.qa_chain import QAChain
+from chatbot.vector_store_cache import vector_store_cache
+
+
+def time_stream(events) -> tuple[float, float]:
+    """Return (seconds to the first token, seconds to the last one)."""
+    start = time.perf_counter()
+    first = None
+    for event in events:
+        if "content" in event and first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+async def time_astream(events) -> tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    async for event in events:
+        if "content" in event and first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def report(name, timings) -> None:
+    first, total = zip(*timings)
+    print(
+        f"{name:<12} first token p50={statistics.median(first) * 1000:8.2f} ms  "
+        f"full answer p50={statistics.median(total) * 1000:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    embeddings = fake_embeddings()
+    answer = "هذه إجابة تجريبية من السياق. " * 10
+    questions = [f"ما هو موضوع الماده رقم {i}؟" for i in range(args.questions)]
+
+    with tempfile.TemporaryDirectory() as index_path:
+        vector_store = FAISS.from_documents(
+            synthetic_chunks(args.chunks), embedding=embeddings
+        )
+        vector_store_cache.put(index_path, vector_store)
+
+        qa_chain = QAChain(
+            embeddings,
+            index_path=index_path,
+            llm=fake_llm(answer, sleep=args.token_delay),
+            retrieval_mode="vector",
+        )
+        # Every question is different, so none is answered from the cache.
+        report(
+            "stream",
+            [time_stream(qa_chain.stream_answer(q)) for q in questions],
+        )
+
+        async def concurrent_chats():
+            questions = [f"سؤال رقم {i} عن الدستور" for i in range(args.concurrency)]
+            start = time.perf_counter()
+            timings = await asyncio.gather(
+                *(time_astream(qa_chain.astream_answer(q)) for q in questions)
+            )
+            return timings, time.perf_counter() - start
+
+        timings, elapsed = asyncio.run(concurrent_chats())
+        report(f"astream x{args.concurrency}", timings)
+        sequential = args.concurrency * len(answer) * args.token_delay
+        print(
+            f"{args.concurrency} concurrent chats took {elapsed:.2f} s "
+            f"(about {sequential:.2f} s of generation if served one at a time)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Measure map-reduce summarization wall time as documents grow, against a
+local fake model with a fixed per-request latency. Then check that uploading
+the same PDF again, from concurrent sessions or after a restart, doesn't call
+the model again; exits non-zero if it does.
+
+    python -m benchmarks.bench_summarization --pages 50 200 800 --workers 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.fakes import synthetic_chunks
+
+os.environ.setdefault("GOOGLE_API_KEY_SUMMARIZATION", "offline")
+from summarization.summary import FileSummarizer  # noqa: E402
+from summarization.summary_cache import SummaryCache  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Returns the first words of its input after a fixed delay."""
+
+    def __init__(self, latency=0.5):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, contents):
+        self.calls += 1
+        time.sleep(self.latency)
+        return FakeResponse(" ".join(contents[-1].split()[:50]))
+
+
+class OfflineSummarizer(FileSummarizer):
+    """Skips the Gemini file upload, passing the model the PDF's path."""
+
+    def upload_file(self, pdf_path):
+        return pdf_path
+
+
+def check_upload_cache(tmp, latency, sessions=4) -> bool:
+    """Summarize one PDF from concurrent sessions, then after a restart."""
+    pdf_path = os.path.join(tmp, "document.pdf")
+    with open(pdf_path, "wb") as f:
+        f.write(os.urandom(4096))
+    cache_path = os.path.join(tmp, "uploads.sqlite")
+    model = FakeModel(latency)
+
+    cache = SummaryCache(cache_path)
+    threads = [
+        threading.Thread(
+            target=OfflineSummarizer(model=model, cache=cache).upload_and_summarize,
+            args=(pdf_path,),
+        )
+        for _ in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    concurrent_calls = model.calls
+    # A new process opens the same cache file.
+    restarted = OfflineSummarizer(model=model, cache=SummaryCache(cache_path))
+    restarted.upload_and_summarize(pdf_path)
+
+    ok = model.calls == 1 and not cache._key_locks
+    print(
+        f"same PDF from {sessions} sessions: {concurrent_calls} model calls, "
+        f"{model.calls - concurrent_calls} after a restart, "
+        f"{len(cache._key_locks)} key locks left: {'ok' if ok else 'FAILED'}"
+    )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            model = FakeModel(args.latency)
+            cache = SummaryCache(os.path.join(tmp, f"{pages}.sqlite"))
+            summarizer = FileSummarizer(model=model, cache=cache)
+            # Three chunks per page, as in the synthetic chunks' metadata.
+            text_chunks = synthetic_chunks(pages * 3, seed=pages)
+
+            start = time.perf_counter()
+            summarizer.summarize_chunks(text_chunks, max_workers=args.workers)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            summarizer.summarize_chunks(text_chunks, max_workers=args.workers)
+            warm = time.perf_counter() - start
+            print(
+                f"{pages:>5} pages: {cold:6.2f} s cold, {warm * 1000:7.1f} ms cached "
+                f"({model.calls} model calls)"
+            )
+
+        if not check_upload_cache(tmp, args.latency):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Measure the overhead tracing adds to every call of a traced function, with
+structured logging off (the production default) and on.
+
+    python -m benchmarks.bench_tracing --calls 200000
+"""
+import argparse
+import logging
+import time
+
+from utils.tracing import logger, metrics, traced, traced_iter
+
+
+def per_call_ns(fn, calls) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    def work():
+        pass
+
+    traced_work = traced("bench.work")(work)
+    baseline = per_call_ns(work, args.calls)
+    print(f"untraced call        {baseline:8.0f} ns")
+
+    logger.setLevel(logging.INFO)
+    overhead = per_call_ns(traced_work, args.calls) - baseline
+    print(f"span, logging off    {overhead:8.0f} ns")
+
+    start = time.perf_counter()
+    for _ in traced_iter("bench.items", range(args.calls)):
+        pass
+    per_item = (time.perf_counter() - start) / args.calls * 1e9
+    print(f"traced_iter per item {per_item:8.0f} ns")
+
+    # Log lines go to a handler that drops them, to time only their creation.
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    calls = max(1, args.calls // 10)
+    overhead = per_call_ns(traced_work, calls) - baseline
+    print(f"span, logging on     {overhead:8.0f} ns")
+    print(f"{metrics.snapshot()['bench.work']['count']} spans recorded")
+
+
+if __name__ == "__main__":
+    main()
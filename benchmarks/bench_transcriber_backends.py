@@ -0,0 +1,123 @@
+"""
+Real-time factor (transcription seconds per second of audio, lower is
+faster) of the transcriber backends on int16 recordings like the ones
+AudioRecorder and st.audio_input produce. By default it uses the recorded
+temp/user_question.wav plus synthetic 16 kHz clips; pass your own with --wav.
+The HTTP backend posts to HUGGINGFACE_URL_MODEL, or to a local stand-in with
+--fake-http. The whisper backend needs `pip install faster-whisper`.
+
+    python -m benchmarks.bench_transcriber_backends --backends http whisper \
+        --wav question1.wav question2.wav --repeats 3
+"""
+import argparse
+import importlib.util
+import io
+import os
+import statistics
+import time
+import wave
+
+from benchmarks.fakes import fake_transcription_server, synthetic_speech_wav
+from record_and_transcribe import (
+    API_URL,
+    AudioTranscriber,
+    HTTPTranscriberBackend,
+    LocalWhisperBackend,
+    TranscriptionCache,
+)
+
+RECORDED_CLIP = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "temp",
+    "user_question.wav",
+)
+
+
+def duration(audio) -> float:
+    with wave.open(io.BytesIO(audio), "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+def load_clips(args) -> dict:
+    """{name: WAV bytes} of the clips to transcribe."""
+    clips = {}
+    for path in args.wav or [RECORDED_CLIP]:
+        with open(path, "rb") as f:
+            clips[os.path.basename(path)] = f.read()
+    if not args.wav:
+        for seconds in args.synthetic_seconds:
+            clips[f"synthetic {seconds:.0f} s"] = synthetic_speech_wav(seconds)
+    return clips
+
+
+def real_time_factors(backend, clips, repeats) -> None:
+    for name, audio in clips.items():
+        seconds = duration(audio)
+        timings = []
+        for _ in range(repeats + 1):
+            # A fresh cache, so every run transcribes.
+            transcriber = AudioTranscriber(backend, cache=TranscriptionCache())
+            start = time.perf_counter()
+            text = transcriber.transcribe_audio(audio)
+            timings.append(time.perf_counter() - start)
+        first, warm = timings[0], statistics.median(timings[1:])
+        print(
+            f"  {name:<24} {seconds:6.1f} s audio  first RTF={first / seconds:6.3f}  "
+            f"warm RTF={warm / seconds:6.3f}  {text[:40]!r}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=["http", "whisper"],
+        choices=["http", "whisper"],
+    )
+    parser.add_argument("--wav", nargs="+", help="recorded WAV clips to transcribe")
+    parser.add_argument("--synthetic-seconds", type=float, nargs="+", default=[5, 15])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--fake-http", action="store_true", help="post to a local stand-in endpoint"
+    )
+    parser.add_argument("--rtf", type=float, default=0.1, help="of the stand-in")
+    args = parser.parse_args()
+    clips = load_clips(args)
+
+    if "http" in args.backends:
+        server = None
+        if args.fake_http:
+            server, url = fake_transcription_server(real_time_factor=args.rtf)
+        else:
+            url = API_URL
+        if url:
+            print(f"http ({'local stand-in' if server else url}):")
+            real_time_factors(HTTPTranscriberBackend(url), clips, args.repeats)
+        else:
+            print("http: skipped, set HUGGINGFACE_URL_MODEL or pass --fake-http")
+        if server is not None:
+            server.shutdown()
+
+    if "whisper" in args.backends:
+        if importlib.util.find_spec("faster_whisper") is None:
+            print("whisper: skipped, faster-whisper isn't installed")
+            return
+        start = time.perf_counter()
+        backend = LocalWhisperBackend()
+        try:
+            backend.wait_until_ready()
+        except Exception as e:
+            print(f"whisper: skipped, the model couldn't be loaded: {e}")
+            backend.shutdown()
+            return
+        print(
+            f"{backend.name} (worker and model loaded in "
+            f"{time.perf_counter() - start:.1f} s):"
+        )
+        real_time_factors(backend, clips, args.repeats)
+        backend.shutdown()
+
+
+if __name__ == "__main__":
+    main()
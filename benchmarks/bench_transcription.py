@@ -0,0 +1,90 @@
+"""
+Compare the old way of transcribing a recording, one requests.post of the
+whole clip on a new connection, with AudioTranscriber, which splits it at
+silence, posts the segments concurrently over pooled connections and caches
+the result. Runs offline against a local stand-in for the inference endpoint
+that takes --rtf seconds per second of audio.
+
+    python -m benchmarks.bench_transcription --seconds 5 60 --repeats 3
+"""
+import argparse
+import statistics
+import time
+
+import requests
+
+from benchmarks.fakes import fake_transcription_server, synthetic_speech_wav
+from record_and_transcribe import (
+    AudioTranscriber,
+    HTTPTranscriberBackend,
+    TranscriptionCache,
+    split_at_silence,
+)
+
+
+def post_whole_clip(url, audio) -> str:
+    """What AudioTranscriber did before: a fresh connection per recording."""
+    response = requests.post(url, data=audio)
+    return response.json().get("text", "")
+
+
+def timed_runs(fn, repeats) -> float:
+    """Median seconds of repeats calls of fn."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, nargs="+", default=[5, 60])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="s per request")
+    parser.add_argument("--rtf", type=float, default=0.1, help="s per audio second")
+    args = parser.parse_args()
+
+    server, url = fake_transcription_server(args.latency, args.rtf)
+    try:
+        for seconds in args.seconds:
+            audio = synthetic_speech_wav(seconds)
+            segments = split_at_silence(audio)
+            print(f"{seconds:.0f} s clip, {len(segments)} segments:")
+
+            server.connections = 0
+            whole = timed_runs(lambda: post_whole_clip(url, audio), args.repeats)
+            print(
+                f"  post whole clip        {whole * 1000:8.1f} ms  "
+                f"{server.connections / args.repeats:.1f} connections/run"
+            )
+
+            server.connections = 0
+
+            def transcribe_uncached():
+                transcriber = AudioTranscriber(
+                    HTTPTranscriberBackend(url), cache=TranscriptionCache()
+                )
+                transcriber.transcribe_audio(audio)
+
+            segmented = timed_runs(transcribe_uncached, args.repeats)
+            print(
+                f"  segmented, pooled      {segmented * 1000:8.1f} ms  "
+                f"{server.connections / args.repeats:.1f} connections/run"
+            )
+
+            transcriber = AudioTranscriber(
+                HTTPTranscriberBackend(url), cache=TranscriptionCache()
+            )
+            transcriber.transcribe_audio(audio)
+            cached = timed_runs(
+                lambda: transcriber.transcribe_audio(audio), args.repeats
+            )
+            print(f"  rerun, cached          {cached * 1000:8.1f} ms")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
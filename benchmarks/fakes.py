@@ -0,0 +1,194 @@
+"""Offline stand-ins for the Google models and uploaded PDFs, used by the benchmarks."""
+import os
+import random
+import itertools
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+ARABIC_WORDS = [
+    "الكتاب", "المعرفة", "التاريخ", "مصر", "الدستور", "الماده", "الحكومه",
+    "الشعب", "القانون", "الحريه", "العلم", "المدرسه", "الجامعه", "البحث",
+    "الاقتصاد", "الدوله", "المواطن", "الحق", "الواجب", "السلطه",
+]
+
+
+def fake_embeddings(size=768) -> DeterministicFakeEmbedding:
+    """Embeddings that hash the text into a fixed vector, with no network calls."""
+    return DeterministicFakeEmbedding(size=size)
+
+
+def fake_llm(answer="هذه إجابة تجريبية من السياق.", sleep=None) -> FakeListChatModel:
+    """
+    A chat model that always answers with the same text. When streaming, it
+    waits sleep seconds before each character, like a model generating tokens.
+    """
+    return FakeListChatModel(responses=[answer], sleep=sleep)
+
+
+def synthetic_text(n_words, seed=0) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(ARABIC_WORDS) for _ in range(n_words))
+
+
+def synthetic_chunks(n_chunks, words_per_chunk=200, seed=0) -> list[Document]:
+    """Arabic-looking chunks with the same metadata PyPDFLoader produces."""
+    return [
+        Document(
+            synthetic_text(words_per_chunk, seed=seed + i),
+            metadata={"source": "synthetic.pdf", "page": i // 3},
+        )
+        for i in range(n_chunks)
+    ]
+
+
+ARABIC_FONT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "Noto_Sans_Arabic",
+    "static",
+    "NotoSansArabic-Regular.ttf",
+)
+
+
+def write_synthetic_pdf(
+    pdf_path, n_pages, lines_per_page=30, words_per_line=10, images_per_page=0, seed=0
+) -> str:
+    """
+    Write an Arabic PDF of n_pages pages of synthetic text, with
+    images_per_page noise images on each page, and return its path.
+    """
+    # Imported here so the other benchmarks don't need matplotlib.
+    import numpy as np
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.font_manager import FontProperties
+    from arabic_reshaper import reshape
+    from bidi.algorithm import get_display
+
+    # Embed TrueType fonts, so the text can be extracted again.
+    matplotlib.rcParams["pdf.fonttype"] = 42
+    font = FontProperties(fname=ARABIC_FONT, size=9)
+    rng = np.random.default_rng(seed)
+    with PdfPages(pdf_path) as pdf:
+        for page in range(n_pages):
+            fig = plt.figure(figsize=(8.27, 11.69))
+            for line in range(lines_per_page):
+                text = synthetic_text(words_per_line, seed=seed + page * 1000 + line)
+                fig.text(
+                    0.92,
+                    0.95 - line * 0.85 / lines_per_page,
+                    get_display(reshape(text)),
+                    fontproperties=font,
+                    ha="right",
+                )
+            for image in range(images_per_page):
+                x, y = 0.1 + 0.4 * (image % 2), 0.02 + 0.1 * (image // 2)
+                ax = fig.add_axes([x, y, 0.35, 0.08])
+                ax.imshow(rng.integers(0, 255, (64, 256), dtype=np.uint8), cmap="gray")
+                ax.axis("off")
+            pdf.savefig(fig)
+            plt.close(fig)
+    return pdf_path
+
+
+def synthetic_speech_wav(seconds, fs=16000, seed=0) -> bytes:
+    """
+    A mono int16 WAV recording like AudioRecorder's, made of tone bursts of
+    0.5-3 s separated by 0.2-0.8 s pauses, so it can be split at silence.
+    """
+    import io
+    import wave
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(seconds * fs), dtype=np.float32)
+    position = 0
+    while position < len(samples):
+        burst = int(rng.uniform(0.5, 3.0) * fs)
+        t = np.arange(min(burst, len(samples) - position)) / fs
+        samples[position : position + len(t)] = 8000 * np.sin(
+            2 * np.pi * rng.uniform(120, 300) * t
+        ) + rng.normal(0, 500, len(t))
+        position += burst + int(rng.uniform(0.2, 0.8) * fs)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(fs)
+        wav.writeframes(np.clip(samples, -32768, 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def fake_transcription_server(latency=0.05, real_time_factor=0.1):
+    """
+    Start a local stand-in for the Hugging Face inference endpoint on a free
+    port. Each request takes latency seconds plus real_time_factor times the
+    duration of the posted WAV, and answers {"text": ...}. Returns the server,
+    whose `requests` and `connections` attributes count what it served, and
+    its URL. Call server.shutdown() when done.
+    """
+    import io
+    import json
+    import time
+    import wave
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class TranscriptionHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            with server.lock:
+                server.connections += 1
+
+        def do_POST(self):
+            audio = self.rfile.read(int(self.headers["Content-Length"]))
+            with wave.open(io.BytesIO(audio), "rb") as wav:
+                duration = wav.getnframes() / wav.getframerate()
+            time.sleep(latency + real_time_factor * duration)
+            with server.lock:
+                server.requests += 1
+            body = json.dumps({"text": f"مقطع مدته {duration:.1f} ثانية"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TranscriptionHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def zipf_chunks(n_chunks, vocabulary=20000, words_per_chunk=200, seed=0):
+    """
+    Chunks whose words follow a Zipf distribution over a vocabulary of that
+    many distinct Arabic-looking words, like real text: a few words are in
+    almost every chunk and most are rare.
+    """
+    rng = random.Random(seed)
+    words = [
+        f"{ARABIC_WORDS[i % len(ARABIC_WORDS)]}{i // len(ARABIC_WORDS) or ''}"
+        for i in range(vocabulary)
+    ]
+    cum_weights = list(
+        itertools.accumulate(1 / rank for rank in range(1, vocabulary + 1))
+    )
+    return [
+        Document(
+            " ".join(rng.choices(words, cum_weights=cum_weights, k=words_per_chunk)),
+            metadata={"source": "synthetic.pdf", "page": i // 3},
+        )
+        for i in range(n_chunks)
+    ]
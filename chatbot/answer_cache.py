@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+import dotenv
+
+dotenv.load_dotenv()
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+# Documents with an answer cache; the least recently used one is dropped.
+ANSWER_CACHE_DOCUMENTS = int(os.getenv("ANSWER_CACHE_DOCUMENTS", "32"))
+# Cosine similarity from which a new question reuses a cached answer; empty
+# disables the semantic tier.
+ANSWER_CACHE_SIMILARITY = os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")
+
+
+class AnswerCache:
+    """
+    LRU cache of answers for one document, keyed by the normalized question,
+    with entries expiring after ttl seconds. If similarity_threshold is set,
+    a question whose embedding is close enough to a cached question's reuses
+    its answer as well. Answers don't depend on the chat history here, so
+    follow-up questions that only make sense in context may collide.
+    """
+
+    def __init__(
+        self,
+        max_entries=ANSWER_CACHE_SIZE,
+        ttl=ANSWER_CACHE_TTL,
+        similarity_threshold=None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.semantic_hits + self.misses
+        return (self.hits + self.semantic_hits) / lookups if lookups else 0.0
+
+    def get(self, question) -> dict:
+        """Exact lookup by normalized question. Misses are counted by get_similar."""
+        with self._lock:
+            entry = self._live_entry(question)
+            if entry is None:
+                return None
+            self._entries.move_to_end(question)
+            self.hits += 1
+            return entry[0]
+
+    def get_similar(self, vector) -> dict:
+        """Return the answer of the closest cached question, if it's close enough."""
+        with self._lock:
+            best_question, best_score = None, -1.0
+            if vector is not None and self.similarity_threshold is not None:
+                vector = _unit(vector)
+                for question in list(self._entries):
+                    entry = self._live_entry(question)
+                    if entry is None or entry[1] is None:
+                        continue
+                    score = float(np.dot(vector, entry[1]))
+                    if score > best_score:
+                        best_question, best_score = question, score
+            if best_question is None or best_score < self.similarity_threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_question)
+            self.semantic_hits += 1
+            return self._entries[best_question][0]
+
+    def put(self, question, answer, vector=None) -> None:
+        with self._lock:
+            unit = _unit(vector) if vector is not None else None
+            self._entries[question] = (answer, unit, time.monotonic())
+            self._entries.move_to_end(question)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def _live_entry(self, question):
+        entry = self._entries.get(question)
+        if entry is not None and time.monotonic() - entry[2] > self.ttl:
+            del self._entries[question]
+            return None
+        return entry
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+_caches = OrderedDict()
+_caches_lock = threading.Lock()
+
+
+def answer_cache_for(key, max_documents=ANSWER_CACHE_DOCUMENTS) -> AnswerCache:
+    """
+    The answer cache shared by every session chatting with the same document.
+    Only the max_documents most recently used documents keep their cache.
+    """
+    with _caches_lock:
+        if key not in _caches:
+            threshold = (
+                float(ANSWER_CACHE_SIMILARITY) if ANSWER_CACHE_SIMILARITY else None
+            )
+            _caches[key] = AnswerCache(similarity_threshold=threshold)
+        _caches.move_to_end(key)
+        while len(_caches) > max_documents:
+            _caches.popitem(last=False)
+        return _caches[key]
+
+
+def answer_cache_stats() -> dict:
+    """{document key: stats} of every answer cache still kept."""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {key: cache.stats() for key, cache in caches.items()}
@@ -0,0 +1,110 @@
+import os
+from collections import deque
+import dotenv
+
+dotenv.load_dotenv()
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "800"))
+CHAT_HISTORY_MAX_TURNS = int(os.getenv("CHAT_HISTORY_MAX_TURNS", "4"))
+CHAT_HISTORY_SUMMARY_TOKENS = int(os.getenv("CHAT_HISTORY_SUMMARY_TOKENS", "200"))
+# Words of each older answer kept in the rolling summary.
+SUMMARY_ANSWER_TOKENS = 25
+
+
+def estimate_tokens(text) -> int:
+    """Rough token count, good enough for budgeting prompts."""
+    return len(text.split())
+
+
+def truncate_words(text, max_tokens) -> str:
+    """The first words of text, ending with "..." if any were cut."""
+    words = text.split()
+    if len(words) <= max_tokens:
+        return text
+    return " ".join(words[: max(0, max_tokens - 1)] + ["..."])
+
+
+def fold_turn(summary, question, answer, max_tokens) -> str:
+    """
+    Default rolling summary: one line per older turn, with its question and
+    the start of its answer. The oldest turns are dropped whole to keep it
+    within max_tokens words.
+    """
+    answer = truncate_words(" ".join(answer.split()), SUMMARY_ANSWER_TOKENS)
+    turn = f"Q: {' '.join(question.split())} A: {answer}"
+    turns = summary.splitlines() + [truncate_words(turn, max_tokens)]
+    tokens = sum(estimate_tokens(turn) for turn in turns)
+    while tokens > max_tokens:
+        tokens -= estimate_tokens(turns.pop(0))
+    return "\n".join(turns)
+
+
+class ChatHistoryWindow:
+    """
+    Bounded view of a conversation for the prompt: the last max_turns turns
+    verbatim, within max_tokens, plus a rolling summary of older turns that
+    is updated incrementally as turns leave the window. A single turn over
+    max_tokens is truncated to fit.
+    """
+
+    def __init__(
+        self,
+        max_tokens=CHAT_HISTORY_MAX_TOKENS,
+        max_turns=CHAT_HISTORY_MAX_TURNS,
+        summary_tokens=CHAT_HISTORY_SUMMARY_TOKENS,
+        summarize=fold_turn,
+    ):
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self.summary = ""
+        self.turns = deque()
+        self._tokens = 0
+        self._seen = 0
+
+    def add_turn(self, question, answer) -> None:
+        self._append(question, answer)
+        while len(self.turns) > self.max_turns or (
+            self._tokens > self.max_tokens and len(self.turns) > 1
+        ):
+            old_question, old_answer, tokens = self.turns.popleft()
+            self._tokens -= tokens
+            self.summary = self.summarize(
+                self.summary, old_question, old_answer, self.summary_tokens
+            )
+        if self._tokens > self.max_tokens:
+            # Only this turn is left and it doesn't fit on its own.
+            question, answer, tokens = self.turns.pop()
+            self._tokens -= tokens
+            question = truncate_words(question, self.max_tokens // 2)
+            answer_tokens = self.max_tokens - estimate_tokens(f"User: {question}\nAI:")
+            self._append(question, truncate_words(answer, answer_tokens))
+
+    def _append(self, question, answer) -> None:
+        tokens = estimate_tokens(f"User: {question}\nAI: {answer}")
+        self.turns.append((question, answer, tokens))
+        self._tokens += tokens
+
+    def sync(self, chat_history) -> None:
+        """
+        Add the turns of chat_history that haven't been seen yet, starting
+        over if the history was cleared or shortened.
+        """
+        if len(chat_history) < self._seen:
+            self.reset()
+        for entry in chat_history[self._seen :]:
+            self.add_turn(entry["question"], entry["answer"])
+        self._seen = len(chat_history)
+
+    def reset(self) -> None:
+        self.summary = ""
+        self.turns.clear()
+        self._tokens = 0
+        self._seen = 0
+
+    def render(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"Earlier conversation:\n{self.summary}")
+        parts.extend(f"User: {q}\nAI: {a}" for q, a, _ in self.turns)
+        return "\n".join(parts)
@@ -1,4 +1,6 @@
 import os
+import asyncio
+import logging
 import dotenv
 import warnings
 import streamlit as st
@@ -6,23 +8,72 @@ import streamlit as st
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains import create_retrieval_chain
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from text_processing.preprocessing import preprocess
-from langchain.vectorstores import FAISS
-from collections import Counter
+from chatbot.vector_store_cache import vector_store_cache
+from chatbot.chat_history import ChatHistoryWindow
+from chatbot.answer_cache import answer_cache_for
+from text_processing.bm25_index import reciprocal_rank_fusion
+from text_processing.mapped_index import load_mapped_index
+from utils.resources import get_resource
+from utils.tracing import span, traced, traced_aiter, traced_iter
+from contextlib import nullcontext
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import NamedTuple
 
 
 dotenv.load_dotenv()
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 FAISS_INDEX_PATH = os.getenv("FAISS_INDEX_PATH")
+# "hybrid" fuses BM25 and vector results, "vector" or "lexical" use only one.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Seconds hybrid retrieval waits for the embedding service before answering
+# from the lexical results alone.
+VECTOR_SEARCH_TIMEOUT = float(os.getenv("VECTOR_SEARCH_TIMEOUT", "5"))
+
+_search_executor = ThreadPoolExecutor(max_workers=8)
+logger = logging.getLogger(__name__)
+
+
+class PreparedAnswer(NamedTuple):
+    """What generating an answer needs once its context is retrieved."""
+
+    inputs: dict
+    page: int
+    query: str
+    vector: list
+    cacheable: bool
 
 
 class QAChain:
-    def __init__(self, embeddings):
+    def __init__(
+        self,
+        embeddings,
+        index_path=FAISS_INDEX_PATH,
+        llm=None,
+        indexer=None,
+        bm25=None,
+        retrieval_mode=RETRIEVAL_MODE,
+        corpus=None,
+        doc_id=None,
+        index_store=None,
+    ):
         self.embeddings = embeddings
+        self.index_path = index_path
+        self.llm = llm
+        # While the document is still being indexed, search the partial indexes.
+        self.indexer = indexer
+        self.bm25 = bm25
+        self.retrieval_mode = retrieval_mode
+        # Searched instead when a question is scoped to other documents or pages.
+        self.corpus = corpus
+        # This document's key in the corpus and in index_store, whose
+        # eviction order is refreshed whenever the index is used.
+        self.doc_id = doc_id
+        self.index_store = index_store
         self.prompt_template = """
             Your name: "بالعربي"
             Your role: تقديم إجابات مفصلة على الأسئلة بناءً على السياق المقدم باللغة العربية فقط.
@@ -35,7 +86,14 @@ class QAChain:
             Context:
             {context}
         """.strip()
-        self.chain = self._create_documents_chain()
+        # Chains around the default model are shared by every QAChain.
+        if llm is None:
+            self.chain = get_resource(
+                "qa_documents_chain:gemini-1.5-flash", self._create_documents_chain
+            )
+        else:
+            self.chain = self._create_documents_chain()
+        self.answer_cache = answer_cache_for(index_path)
 
     def _preapare_model(self) -> ChatGoogleGenerativeAI:
         """Load the conversational chain for question answering."""
@@ -45,7 +103,9 @@ class QAChain:
         return model
 
     def _create_documents_chain(self):
-        llm = self._preapare_model()
+        llm = self.llm or get_resource(
+            "chat_model:gemini-1.5-flash", self._preapare_model
+        )
         prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", self.prompt_template),
@@ -55,43 +115,211 @@ class QAChain:
         qa = create_stuff_documents_chain(llm, prompt)
         return qa
 
-    def answer_question(self, user_question, session_key):
-        """Answer the user's question based on the context, incorporating history."""
-        try:
-            chat_history = st.session_state[session_key].get("chat_history", [])
+    @traced("qa.load_vector_store")
+    def _load_vector_store(self):
+        return load_mapped_index(self.index_path, self.embeddings)
+
+    def _get_vector_store(self):
+        """Return the resident vector store, or the partial one while indexing."""
+        if self.indexer is not None and not self.indexer.done:
+            return self.indexer.vector_store
+        if self.index_store is not None:
+            self.index_store.touch(self.doc_id)
+        return vector_store_cache.get_or_load(self.index_path, self._load_vector_store)
 
-            history_text = "\n".join(
-                [
-                    f"User: {entry['question']}\nAI: {entry['answer']}"
-                    for entry in chat_history
-                ]
+    def _search_lock(self):
+        return self.indexer.lock if self.indexer is not None else nullcontext()
+
+    @traced("qa.vector_search")
+    def _vector_search(self, query):
+        """Embed query and search the vector store, returning (vector, chunks)."""
+        vector_store = self._get_vector_store()
+        if vector_store is None:
+            return None, None
+        vector = self.embeddings.embed_query(query)
+        with self._search_lock():
+            return vector, vector_store.similarity_search_by_vector(vector, k=9)
+
+    @traced("qa.lexical_search")
+    def _lexical_search(self, query):
+        bm25 = self.indexer.bm25 if self.indexer is not None else self.bm25
+        if bm25 is None:
+            return None
+        with self._search_lock():
+            return bm25.search(query, k=9)
+
+    @traced("qa.retrieve")
+    def retrieve(self, query, doc_ids=None, page_range=None):
+        """
+        Return (chunks, query embedding). chunks is None if nothing is indexed
+        yet, and the embedding is None if the vector search didn't run, timed
+        out or failed. Filtering by doc_ids or page_range searches the corpus;
+        a page range alone applies to this document.
+        """
+        if page_range and not doc_ids:
+            doc_ids = [self.doc_id]
+        if self.corpus is not None and (doc_ids or page_range):
+            return self.corpus.search(query, 9, doc_ids, page_range) or None, None
+        if self.retrieval_mode == "lexical":
+            return self._lexical_search(query), None
+        if self.retrieval_mode == "vector":
+            vector, vector_docs = self._vector_search(query)
+            return vector_docs, vector
+
+        # Run in a copy of this context, so its span nests under this one.
+        future = _search_executor.submit(
+            copy_context().run, self._vector_search, query
+        )
+        lexical_docs = self._lexical_search(query)
+        try:
+            vector, vector_docs = future.result(timeout=VECTOR_SEARCH_TIMEOUT)
+        except TimeoutError:
+            logger.warning("Vector search timed out, answering from lexical results.")
+            vector, vector_docs = None, None
+        except Exception as e:
+            # E.g. the embedding service is unreachable or over its quota.
+            logger.warning(
+                "Vector search failed, answering from lexical results: %s", e
             )
-            full_prompt = f"{self.prompt_template}\n\nChat History:\n{history_text}\n\nUser: {user_question}"
+            vector, vector_docs = None, None
+        if vector_docs is None and lexical_docs is None:
+            return None, vector
+        results = [docs for docs in (vector_docs, lexical_docs) if docs]
+        return reciprocal_rank_fusion(results, k=9), vector
+
+    def _full_prompt(self, user_question, session_key) -> str:
+        """The question with the bounded chat history of session_key, if any."""
+        if session_key is None:
+            return f"Chat History:\n\n\nUser: {user_question}"
+        session = st.session_state[session_key]
+        history = session.setdefault("history_window", ChatHistoryWindow())
+        history.sync(session.get("chat_history", []))
+        return f"Chat History:\n{history.render()}\n\nUser: {user_question}"
 
-            # Load and configure the FAISS vector store
-            db_vector = FAISS.load_local(
-                FAISS_INDEX_PATH, self.embeddings, allow_dangerous_deserialization=True
+    def _prepare_answer(self, user_question, full_prompt, doc_ids, page_range):
+        """
+        Retrieve the context for a question. Returns (answer, None) if the
+        answer is cached or can't be generated yet, else (None, prepared).
+        """
+        # Only the question is searched; the history would dilute it.
+        query = preprocess(user_question)
+        # The answer cache only holds answers about this whole document.
+        scoped = bool(doc_ids or page_range)
+        cached = None if scoped else self.answer_cache.get(query)
+        if cached is not None:
+            return cached, None
+
+        context, vector = self.retrieve(query, doc_ids, page_range)
+        # The search already embedded the question, so this is nearly free.
+        cached = self.answer_cache.get_similar(vector)
+        if cached is not None:
+            return cached, None
+        if not context:
+            return {
+                "content": "لا يزال المستند قيد المعالجة، حاول مرة أخرى بعد قليل.",
+                "page": -1,
+            }, None
+        with span("qa.preprocess_prompt", chars=len(full_prompt)):
+            prompt = preprocess(full_prompt)
+        return None, PreparedAnswer(
+            inputs={"input": prompt, "context": context},
+            page=context[0].metadata["page"] + 1,
+            query=query,
+            vector=vector,
+            # Answers from a partially indexed document may improve later.
+            cacheable=not scoped and (self.indexer is None or self.indexer.done),
+        )
+
+    def _finish_answer(self, prepared, content) -> dict:
+        answer = {
+            "content": content,
+            "page": (-1 if "غير موجودة" in content else prepared.page),
+        }
+        if prepared.cacheable:
+            self.answer_cache.put(prepared.query, answer, prepared.vector)
+        return answer
+
+    @traced("qa.answer_question")
+    def answer_question(
+        self, user_question, session_key, doc_ids=None, page_range=None
+    ):
+        """
+        Answer the user's question based on the context, incorporating history.
+        doc_ids and page_range scope the search to those documents and pages.
+        """
+        answer = {"content": "", "page": -1}
+        for event in self.stream_answer(
+            user_question, session_key, doc_ids, page_range
+        ):
+            if "page" in event:
+                answer["page"] = event["page"]
+            else:
+                answer["content"] += event["content"]
+        return answer
+
+    @traced("qa.stream_answer")
+    def stream_answer(
+        self, user_question, session_key=None, doc_ids=None, page_range=None
+    ):
+        """
+        Answer like answer_question, yielding the answer as it's generated:
+        {"page": n} once retrieval finishes, then {"content": token} pieces,
+        and {"page": -1} at the end if the answer isn't in the document.
+        Without a session_key the question is answered without chat history.
+        """
+        try:
+            full_prompt = self._full_prompt(user_question, session_key)
+            answer, prepared = self._prepare_answer(
+                user_question, full_prompt, doc_ids, page_range
             )
-            retriever = db_vector.as_retriever(search_kwargs={"k": 9})
-            retrieval_chain = create_retrieval_chain(retriever, self.chain)
-            result = retrieval_chain.invoke({"input": preprocess(full_prompt)})
-            content = result.get("answer")
-            page_numbers = [doc.dict()["metadata"]["page"] for doc in result["context"]]
-            page_counts = Counter(page_numbers)
-
-            most_common_page = (
-                page_counts.most_common(1)[0][0]
-                if page_counts
-                else page_numbers[0] if page_numbers else None
+            if answer is not None:
+                yield {"page": answer["page"]}
+                yield {"content": answer["content"]}
+                return
+
+            yield {"page": prepared.page}
+            content = ""
+            for token in traced_iter("qa.generate", self.chain.stream(prepared.inputs)):
+                content += token
+                yield {"content": token}
+            answer = self._finish_answer(prepared, content)
+            if answer["page"] != prepared.page:
+                yield {"page": answer["page"]}
+        except Exception as e:
+            print(f"Error answering question: {e}")
+            yield {"page": -1}
+            yield {"content": "Error occurred while processing the question."}
+
+    @traced("qa.astream_answer")
+    async def astream_answer(
+        self, user_question, session_key=None, doc_ids=None, page_range=None
+    ):
+        """
+        Async version of stream_answer. Retrieval runs in a worker thread and
+        generation streams from the model asynchronously, so one event loop
+        can serve many chats at once.
+        """
+        try:
+            full_prompt = self._full_prompt(user_question, session_key)
+            answer, prepared = await asyncio.to_thread(
+                self._prepare_answer, user_question, full_prompt, doc_ids, page_range
             )
+            if answer is not None:
+                yield {"page": answer["page"]}
+                yield {"content": answer["content"]}
+                return
 
-            return {
-                "content": content,
-                "page": (-1 if "غير موجودة" in content else page_numbers[0] + 1),
-            }
+            yield {"page": prepared.page}
+            content = ""
+            async for token in traced_aiter(
+                "qa.generate", self.chain.astream(prepared.inputs)
+            ):
+                content += token
+                yield {"content": token}
+            answer = self._finish_answer(prepared, content)
+            if answer["page"] != prepared.page:
+                yield {"page": answer["page"]}
         except Exception as e:
             print(f"Error answering question: {e}")
-            return {
-                "content": "Error occurred while processing the question.",
-                "page": -1,
-            }
+            yield {"page": -1}
+            yield {"content": "Error occurred while processing the question."}
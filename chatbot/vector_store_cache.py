@@ -0,0 +1,75 @@
+import os
+import threading
+from collections import OrderedDict
+import dotenv
+
+dotenv.load_dotenv()
+
+VECTOR_STORE_CACHE_MB = int(os.getenv("VECTOR_STORE_CACHE_MB", "1024"))
+
+
+def estimate_store_size(vector_store) -> int:
+    """Approximate the resident size in bytes of a FAISS vector store."""
+    index = vector_store.index
+    vectors_size = index.ntotal * index.d * 4
+    # Docstores read from disk (see mapped_index) keep no texts in memory.
+    texts_size = sum(
+        len(doc.page_content.encode("utf-8"))
+        for doc in getattr(vector_store.docstore, "_dict", {}).values()
+    )
+    return vectors_size + texts_size
+
+
+class VectorStoreCache:
+    """
+    Keeps loaded vector stores resident in memory, keyed by index path, and
+    evicts the least recently used ones once the total size exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._stores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached vector store for key, or None if it's not loaded."""
+        with self._lock:
+            entry = self._stores.get(key)
+            if entry is None:
+                return None
+            self._stores.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, vector_store) -> None:
+        """Cache a vector store and evict older ones to stay within budget."""
+        size = estimate_store_size(vector_store)
+        with self._lock:
+            self._stores[key] = (vector_store, size)
+            self._stores.move_to_end(key)
+            self._evict()
+
+    def get_or_load(self, key, loader):
+        """Return the cached vector store for key, loading it on a miss."""
+        vector_store = self.get(key)
+        if vector_store is None:
+            vector_store = loader()
+            self.put(key, vector_store)
+        return vector_store
+
+    def discard(self, key) -> None:
+        with self._lock:
+            self._stores.pop(key, None)
+
+    def total_size(self) -> int:
+        with self._lock:
+            return sum(size for _, size in self._stores.values())
+
+    def _evict(self) -> None:
+        # Always keep the most recently used store, even if it alone is too big.
+        total = sum(size for _, size in self._stores.values())
+        while total > self.max_bytes and len(self._stores) > 1:
+            _, (_, size) = self._stores.popitem(last=False)
+            total -= size
+
+
+vector_store_cache = VectorStoreCache(VECTOR_STORE_CACHE_MB * 1024 * 1024)
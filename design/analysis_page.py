@@ -1,15 +1,56 @@
+import os
 import streamlit as st
 from analysis.pdf_analysis import perform_analysis
 from summarization.summary import FileSummarizer
+from utils.resources import get_resource
+
+# Larger documents are summarized chunk group by chunk group (map-reduce).
+SUMMARY_MAP_REDUCE_PAGES = int(os.getenv("SUMMARY_MAP_REDUCE_PAGES", "100"))
+
+
+def summarize(session_key):
+    """
+    Summarize the session's PDF, or return None if its chunks aren't ready.
+    Summarization errors are raised.
+    """
+    session = st.session_state[session_key]
+    text_chunks = session["text_chunks"]
+    indexer = session.get("indexer")
+    if text_chunks:
+        page_count = text_chunks[-1].metadata["page"] + 1
+    elif indexer is not None:
+        # The page count is known once the ingestion job starts.
+        if indexer.total_pages is None:
+            return None
+        page_count = indexer.total_pages
+    else:
+        page_count = 0
+
+    summarizer = get_resource("file_summarizer:gemini-1.5-flash", FileSummarizer)
+    if page_count > SUMMARY_MAP_REDUCE_PAGES:
+        return summarizer.summarize_chunks(text_chunks) if text_chunks else None
+    return summarizer.upload_and_summarize(session["file_path"])
 
 
 def show_analysis_page(session_key):
     st.title("PDF Analysis")
-    summarizer = FileSummarizer()
-    summary = summarizer.upload_and_summarize(
-        st.session_state[session_key]["file_path"]
-    )
-    st.write(summary)
+    session = st.session_state[session_key]
+    # Reruns reuse the session's summary; new sessions hit the persistent cache.
+    if not session.get("summary") and not session.get("summary_error"):
+        try:
+            session["summary"] = summarize(session_key)
+        except Exception as e:
+            # Kept until the user retries, rather than failing on every rerun.
+            session["summary_error"] = str(e)
+    if session.get("summary_error"):
+        st.error(f"Summarizing the document failed: {session['summary_error']}")
+        if st.button("Retry the summary"):
+            session["summary_error"] = None
+            st.rerun()
+    elif session["summary"]:
+        st.write(session["summary"])
+    else:
+        st.info("The summary will be available once the document is indexed.")
 
     if st.session_state[session_key]["text_chunks"]:
         statistics = perform_analysis(
@@ -20,5 +61,12 @@ def show_analysis_page(session_key):
         st.write("### Top Word Frequencies")
         st.dataframe(statistics)
 
+    elif (
+        st.session_state[session_key].get("indexer") is not None
+        and not st.session_state[session_key]["indexer"].done
+    ):
+        st.info(
+            "The document is still being indexed. Statistics will appear once it's done."
+        )
     else:
         st.warning("No text data available for analysis.")
@@ -1,8 +1,25 @@
-import os
 import streamlit as st
 from streamlit_chat import message
 from streamlit_extras.colored_header import colored_header
-from record_and_transcribe import AudioTranscriber
+from record_and_transcribe import AudioTranscriber, transcriber_backend_warning
+
+
+@st.fragment(run_every=1)
+def show_ingestion_status(job, ingestion_queue):
+    """Poll the document's ingestion job until it finishes."""
+    if job.finished:
+        st.rerun()
+    if job.state == "queued":
+        position = ingestion_queue.position(job)
+        st.info(f"Waiting for a free worker ({position} documents ahead).")
+        return
+    indexer = job.indexer
+    st.progress(
+        indexer.progress,
+        text=f"{job.state.capitalize()} pages "
+        f"{indexer.indexed_pages}/{indexer.total_pages or '?'}. "
+        "You can already ask about the pages indexed so far.",
+    )
 
 
 class ChatPage:
@@ -13,7 +30,45 @@ class ChatPage:
         if self.qa_chain is None:
             st.error("Error: QA chain is not initialized. Please upload a PDF first.")
 
-    def generate_response(self, user_input):
+    def select_documents(self):
+        """
+        Let the user pick which of their uploaded documents to search. Returns
+        the selected document keys, or None for just the current document.
+        """
+        documents = {
+            value["doc_key"]: value["title"]
+            for key, value in st.session_state.items()
+            if key.startswith("file_") and value.get("doc_key")
+        }
+        current = st.session_state[self.session_key].get("doc_key")
+        if len(documents) < 2 or current not in documents:
+            return None
+        selected = st.sidebar.multiselect(
+            "Search in documents",
+            options=list(documents),
+            default=[current],
+            format_func=documents.get,
+        )
+        return None if selected == [current] else selected
+
+    def select_page_range(self):
+        """
+        Let the user limit the search to a range of pages of the indexed
+        document. Returns the 0-based, inclusive (first, last) page range, or
+        None for every page.
+        """
+        text_chunks = st.session_state[self.session_key].get("text_chunks")
+        if not text_chunks:
+            return None
+        page_count = text_chunks[-1].metadata["page"] + 1
+        if page_count < 2:
+            return None
+        first, last = st.sidebar.slider(
+            "Search in pages", 1, page_count, (1, page_count)
+        )
+        return None if (first, last) == (1, page_count) else (first - 1, last - 1)
+
+    def generate_response(self, user_input, doc_ids=None, page_range=None):
         """Generate response for the user input using the QA chain."""
         if not self.qa_chain:
             return {
@@ -21,13 +76,46 @@ class ChatPage:
                 "page": -1,
             }
 
-        data_dict = self.qa_chain.answer_question(user_input, self.session_key)
+        data_dict = self.qa_chain.answer_question(
+            user_input, self.session_key, doc_ids=doc_ids, page_range=page_range
+        )
         response = {
             "content": data_dict["content"],
             "page": data_dict["page"],
         }
         return response
 
+    def stream_response(self, user_input, doc_ids=None, page_range=None):
+        """Show the answer as it streams in; return it like generate_response."""
+        if not self.qa_chain:
+            return self.generate_response(user_input, doc_ids, page_range)
+
+        response = {"content": "", "page": -1}
+
+        def tokens():
+            for event in self.qa_chain.stream_answer(
+                user_input, self.session_key, doc_ids=doc_ids, page_range=page_range
+            ):
+                if "page" in event:
+                    response["page"] = event["page"]
+                else:
+                    response["content"] += event["content"]
+                    yield event["content"]
+
+        # The finished answer is shown with the rest of the chat history.
+        placeholder = st.empty()
+        with placeholder.container():
+            message(
+                user_input,
+                is_user=True,
+                key="streaming_question",
+                avatar_style="initials",
+                seed="QB",
+            )
+            st.write_stream(tokens())
+        placeholder.empty()
+        return response
+
     def display_chat_history(self):
         """Display the chat history for the current session."""
         chat_history = st.session_state[self.session_key].get("chat_history", [])
@@ -47,25 +135,36 @@ class ChatPage:
 
     def handle_audio_input(self):
         """Process and transcribe audio input, if available, and display it in a text input."""
+        backend_warning = transcriber_backend_warning()
+        if backend_warning is not None:
+            st.warning(backend_warning)
+        # Created before anything is recorded, so a local model starts loading.
+        transcriber = AudioTranscriber()
         audio_value = st.audio_input("Record your question:")
         if audio_value:
-            audio_path = os.path.join("temp", "user_question.wav")
-            with open(audio_path, "wb") as f:
-                f.write(audio_value.getbuffer())
-            transcriber = AudioTranscriber()
-            transcribed_text = transcriber.transcribe_audio(audio_path)
+            # Reruns with the same recording hit the transcription cache.
+            transcribed_text = transcriber.transcribe_audio(audio_value.getvalue())
+            if not transcribed_text:
+                st.warning("The recording couldn't be transcribed, record it again.")
             st.session_state["transcribed_text"] = transcribed_text  # Store for editing
             return transcribed_text
 
     def show_chat_page(self):
         """Render the chat page UI, including input handling and chat display."""
         colored_header(label="", description="", color_name="gray-30")
+        job = st.session_state[self.session_key].get("job")
+        if job is not None and not job.finished:
+            from design.main_ui import get_ingestion_queue
+
+            show_ingestion_status(job, get_ingestion_queue())
         st.session_state["transcribed_text"] = ""
+        doc_ids = self.select_documents()
+        page_range = self.select_page_range()
 
         user_input = st.chat_input("Type or say something:")
 
         if user_input:
-            response = self.generate_response(user_input)
+            response = self.stream_response(user_input, doc_ids, page_range)
             st.session_state[self.session_key]["chat_history"].append(
                 {
                     "question": user_input,
@@ -75,7 +174,7 @@ class ChatPage:
             )
         transcribed_text = self.handle_audio_input()
         if transcribed_text:
-            response = self.generate_response(transcribed_text)
+            response = self.stream_response(transcribed_text, doc_ids, page_range)
             st.session_state[self.session_key]["chat_history"].append(
                 {
                     "question": transcribed_text,
@@ -1,11 +1,47 @@
 import os
+import queue
+import hashlib
+import dotenv
 import streamlit as st
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from text_processing.embedding_handler import EmbeddingHandler
-from design.chat_page import ChatPage
-from design.analysis_page import show_analysis_page
 from design.about_page import show_about_page
-from chatbot.qa_chain import QAChain
+from chatbot.vector_store_cache import vector_store_cache
+from utils.resources import get_resource, resources
+
+# The pages and the document pipeline (langchain, FAISS, Gemini clients) are
+# imported where they're first used, so the landing page renders without them.
+
+dotenv.load_dotenv()
+# Show how often shared resources and cached answers were reused in the sidebar.
+SHOW_DEBUG_STATS = os.getenv("SHOW_DEBUG_STATS", "0") == "1"
+
+
+def get_index_store():
+    """The on-disk store of document indexes, opened on first use."""
+    from text_processing.index_store import IndexStore
+
+    return get_resource("index_store", IndexStore)
+
+
+def get_ingestion_queue():
+    """The process-wide queue that ingests uploaded PDFs in the background."""
+    from text_processing.ingestion_queue import IngestionQueue
+
+    return get_resource("ingestion_queue", IngestionQueue)
+
+
+def get_corpus_store(embeddings):
+    """The corpus of every indexed document, restored on first use."""
+    from text_processing.corpus_store import CorpusStore
+
+    def build():
+        index_store = get_index_store()
+        corpus_store = CorpusStore(embeddings, index_store)
+        corpus_store.restore()
+        # Documents evicted from disk leave the corpus too.
+        index_store.eviction_listeners.append(corpus_store.delete_document)
+        return corpus_store
+
+    return get_resource("corpus_store", build)
 
 
 class PDFChatbotUI:
@@ -25,10 +61,18 @@ class PDFChatbotUI:
             st.session_state["transcribed_text"] = ""
 
     def load_embedding_handler(self):
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001", google_api_key=self.google_api_key
-        )
-        return EmbeddingHandler(embeddings)
+        """The embedding handler shared by every session in this process."""
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        from text_processing.embedding_handler import EmbeddingHandler
+        from text_processing.embedding_cache import CachedEmbeddings
+
+        def build():
+            embeddings = GoogleGenerativeAIEmbeddings(
+                model="models/embedding-001", google_api_key=self.google_api_key
+            )
+            return EmbeddingHandler(CachedEmbeddings(embeddings))
+
+        return get_resource("embedding_handler:models/embedding-001", build)
 
     def setup_ui(self):
         st.title(f":violet[{self.page_title}]")
@@ -39,50 +83,178 @@ class PDFChatbotUI:
         )
         uploaded_file = st.sidebar.file_uploader("Upload a PDF", type="pdf")
         if uploaded_file:
-            session_key = f"file_{uploaded_file.name}"
+            session_key = self._session_key(uploaded_file)
             self._process_uploaded_file(uploaded_file, session_key, page_selection)
         else:
             if page_selection == "About":
                 show_about_page(self.logo)
             else:
                 st.info("Please upload a PDF to continue.")
+        if SHOW_DEBUG_STATS:
+            self._show_debug_stats()
+
+    def _show_debug_stats(self):
+        from chatbot.answer_cache import answer_cache_stats
+
+        with st.sidebar.expander("Debug stats"):
+            st.caption("Shared resources")
+            st.json(resources.stats())
+            st.caption("Answer caches")
+            st.json(answer_cache_stats())
+
+    def _session_key(self, uploaded_file):
+        """
+        Key the session by the file's content, hashing it only once per
+        upload rather than on every rerun.
+        """
+        session_keys = st.session_state.setdefault("upload_session_keys", {})
+        session_key = session_keys.get(uploaded_file.file_id)
+        if session_key is None:
+            file_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+            session_key = session_keys[uploaded_file.file_id] = f"file_{file_hash}"
+        return session_key
 
     def _process_uploaded_file(self, uploaded_file, session_key, page_selection):
+        retry = False
+        error = self._ingestion_error(session_key)
+        if error is not None:
+            st.error(f"Processing the document failed: {error}")
+            if not st.button("Retry"):
+                return
+            # Start the session over, submitting the document again.
+            del st.session_state[session_key]
+            retry = True
         if session_key not in st.session_state:
             st.session_state[session_key] = {
                 "chat_history": [],
                 "text_chunks": None,
                 "total_pages": 0,
                 "qa_chain": None,
+                "indexer": None,
+                "job": None,
                 "embedding_handler": self.load_embedding_handler(),
                 "full_text": "",
                 "file_path": "",
+                "summary": None,
+                "summary_error": None,
+                "title": uploaded_file.name,
+                "doc_key": None,
+                "ingestion_error": None,
             }
-            temp_pdf_path = os.path.join("temp", uploaded_file.name)
+            pdf_bytes = uploaded_file.getvalue()
+            temp_pdf_path = os.path.join("temp", f"{session_key}.pdf")
             st.session_state[session_key]["file_path"] = temp_pdf_path
             os.makedirs("temp", exist_ok=True)
             with open(temp_pdf_path, "wb") as f:
-                f.write(uploaded_file.read())
-            self._initialize_text_processing(session_key, temp_pdf_path)
+                f.write(pdf_bytes)
+            try:
+                self._initialize_text_processing(
+                    session_key, temp_pdf_path, pdf_bytes, uploaded_file.name, retry
+                )
+            except queue.Full:
+                # Leave no half-initialized session; the next rerun retries.
+                del st.session_state[session_key]
+                st.warning("The server is busy with other documents, try again soon.")
+                return
+            if self._ingestion_error(session_key) is not None:
+                st.rerun()
+        self._sync_text_chunks(session_key)
 
         if page_selection == "Analysis":
+            from design.analysis_page import show_analysis_page
+
             show_analysis_page(session_key)
         elif page_selection == "Chat with PDF":
+            from design.chat_page import ChatPage
+
             chat_page = ChatPage(session_key)
             chat_page.show_chat_page()
         elif page_selection == "About":
             show_about_page(self.logo)
 
-    def _initialize_text_processing(self, session_key, pdf_path):
+    def _ingestion_error(self, session_key):
+        """Why the session's document couldn't be ingested, if it failed."""
+        session = st.session_state.get(session_key)
+        if session is None:
+            return None
+        job = session["job"]
+        if job is not None and job.state == "failed":
+            return job.error
+        return session["ingestion_error"]
+
+    def _initialize_text_processing(
+        self, session_key, pdf_path, pdf_bytes, title, retry=False
+    ):
+        from text_processing.index_store import chunks_from_store
+        from text_processing.bm25_index import BM25Index
+        from chatbot.qa_chain import QAChain
+
+        index_store = get_index_store()
         embedding_handler = st.session_state[session_key]["embedding_handler"]
-        text_chunks = embedding_handler.get_text_chunks(pdf_path)
-        embedding_handler.get_vector_store(text_chunks)
+        doc_key = embedding_handler.document_key(pdf_bytes)
+        index_path = index_store.index_path(doc_key)
+        corpus = get_corpus_store(embedding_handler.embeddings)
+        st.session_state[session_key]["doc_key"] = doc_key
+
+        # A document we've already indexed skips extraction and embedding.
+        vector_store = vector_store_cache.get(index_path)
+        if vector_store is None:
+            vector_store = index_store.load(doc_key, embedding_handler.embeddings)
+        else:
+            index_store.touch(doc_key)
+
+        job = None
+        bm25 = None
+        if vector_store is not None:
+            # Keep the index resident so chat turns don't reload it.
+            vector_store_cache.put(index_path, vector_store)
+            text_chunks = chunks_from_store(vector_store)
+            bm25 = BM25Index()
+            bm25.add_documents(text_chunks)
+            self._set_text_chunks(session_key, text_chunks)
+            corpus.add_document(doc_key, text_chunks, title)
+        else:
+            # Ingest in the background; chat can use the pages indexed so far.
+            def on_complete(vector_store, text_chunks):
+                index_store.save(doc_key, vector_store)
+                vector_store_cache.put(index_path, vector_store)
+                corpus.add_document(doc_key, text_chunks, title)
 
+            ingestion_queue = get_ingestion_queue()
+            state = ingestion_queue.persisted_state(doc_key)
+            if state is not None and state[0] == "failed" and not retry:
+                # Failures such as a PDF without a text layer would only fail
+                # again, so the document is resubmitted when the user retries.
+                st.session_state[session_key]["ingestion_error"] = state[1]
+            else:
+                # Sessions uploading the same content share one job.
+                job = ingestion_queue.submit(
+                    doc_key, pdf_path, title, embedding_handler, on_complete
+                )
+
+        indexer = job.indexer if job is not None else None
+        st.session_state[session_key]["job"] = job
+        st.session_state[session_key]["indexer"] = indexer
+        st.session_state[session_key]["qa_chain"] = QAChain(
+            embedding_handler.embeddings,
+            index_path=index_path,
+            indexer=indexer,
+            bm25=bm25,
+            corpus=corpus,
+            doc_id=doc_key,
+            index_store=index_store,
+        )
+
+    def _sync_text_chunks(self, session_key):
+        """Publish the chunks of a background indexing run once it finishes."""
+        session = st.session_state[session_key]
+        indexer = session["indexer"]
+        if session["text_chunks"] is None and indexer is not None and indexer.done:
+            self._set_text_chunks(session_key, indexer.text_chunks)
+
+    def _set_text_chunks(self, session_key, text_chunks):
         st.session_state[session_key]["text_chunks"] = text_chunks
         st.session_state[session_key]["total_pages"] = len(text_chunks)
         st.session_state[session_key]["full_text"] = " ".join(
             [doc.dict()["page_content"] for doc in text_chunks]
         )
-        st.session_state[session_key]["qa_chain"] = QAChain(
-            embedding_handler.embeddings
-        )
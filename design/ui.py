@@ -123,13 +123,9 @@ class PDFChatbotUI:
         audio_value = st.experimental_audio_input("Record your question:")
 
         if audio_value:
-            audio_path = os.path.join("temp", "user_question.wav")
-            with open(audio_path, "wb") as f:
-                f.write(audio_value.getbuffer())
-
             transcriber = AudioTranscriber()
             st.session_state["transcribed_text"] = transcriber.transcribe_audio(
-                audio_path
+                audio_value.getvalue()
             )
         user_input = st.text_input(
             "You: ", st.session_state.get("transcribed_text", ""), key="input"
@@ -1,5 +1,7 @@
 import cv2
+import numpy as np
 import pytesseract
+from utils.tracing import traced
 import warnings
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -7,12 +9,22 @@ warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 class OCRProcessor:
     @staticmethod
-    def extract_text_from_image(image_path):
-        """Extract text from an image using Tesseract OCR."""
+    @traced("ocr.extract_text_from_image")
+    def extract_text_from_image(image):
+        """
+        Extract text from an image using Tesseract OCR. The image may be a file
+        path, encoded image bytes or an already decoded numpy array.
+        """
         try:
-            img_cv = cv2.imread(image_path)
+            if isinstance(image, str):
+                img_cv = cv2.imread(image)
+            elif isinstance(image, (bytes, bytearray, memoryview)):
+                img_cv = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+            else:
+                img_cv = image
             arabic_text = pytesseract.image_to_string(img_cv, lang="ara")
             return arabic_text
         except Exception as e:
-            print(f"Error extracting text from image {image_path}: {e}")
+            name = image if isinstance(image, str) else type(image).__name__
+            print(f"Error extracting text from image {name}: {e}")
             return ""
@@ -1,49 +1,151 @@
 import os
-from spire.pdf import PdfDocument, PdfImageHelper
-from PyPDF2 import PdfReader
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, NamedTuple
+import numpy as np
+from pypdf import PdfReader
+from utils.tracing import traced
 import warnings
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 
+class PageRecord(NamedTuple):
+    """Images (decoded numpy arrays) and text extracted from a single page."""
+
+    images: list[np.ndarray]
+    text: str
+    page_number: int
+    elapsed: float = 0.0
+
+
+def _iter_page_range(
+    pdf_reader, extract_images, output_directory, start, stop
+) -> Iterator[PageRecord]:
+    for i in range(start, stop):
+        page_start = time.perf_counter()
+        page = pdf_reader.pages[i]
+        extracted_text = page.extract_text()
+        images = []
+
+        if extract_images:
+            for j, image_file in enumerate(page.images):
+                try:
+                    images.append(_decoded_image(image_file))
+                    if output_directory:
+                        # Only for debugging: OCR reads the decoded pixels.
+                        extension = os.path.splitext(image_file.name)[1] or ".png"
+                        image_file_name = os.path.join(
+                            output_directory, f"Image-{i}-{j}{extension}"
+                        )
+                        with open(image_file_name, "wb") as f:
+                            f.write(image_file.data)
+                except Exception as e:
+                    # One undecodable image shouldn't end the document.
+                    print(f"Error extracting image {j} of page {i}: {e}")
+
+        yield PageRecord(images, extracted_text, i, time.perf_counter() - page_start)
+
+
+def _decoded_image(image_file) -> np.ndarray:
+    """
+    The pixels pypdf decoded from the PDF, without re-encoding them. Palette
+    and CMYK images are converted to RGB, which OCR expects.
+    """
+    image = image_file.image
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+    return np.asarray(image)
+
+
+# The worker process's reader and extraction settings, set by _open_pdf.
+_worker_state = None
+
+
+def _open_pdf(pdf_path, extract_images, output_directory) -> None:
+    """Process pool initializer: parse the PDF once per worker process."""
+    global _worker_state
+    _worker_state = (PdfReader(pdf_path), extract_images, output_directory)
+
+
+def _extract_page_range(page_range) -> list[PageRecord]:
+    """Process pool worker: extract one shard of pages from the worker's reader."""
+    pdf_reader, extract_images, output_directory = _worker_state
+    start, stop = page_range
+    return list(
+        _iter_page_range(pdf_reader, extract_images, output_directory, start, stop)
+    )
+
+
 class PDFExtractor:
     """
-    Extract images and text from a PDF file.
+    Extract images and text from a PDF file, parsing the document only once,
+    or sharding its pages across a pool of worker processes.
     """
 
-    def __init__(self, pdf_path, output_directory):
+    def __init__(
+        self, pdf_path, output_directory=None, workers=1, extract_images=True
+    ):
+        """
+        :param pdf_path: Path of the PDF file
+        :param output_directory: If set, images are also written there for debugging
+        :param workers: Number of processes to shard pages across, 1 runs serially
+        :param extract_images: Whether to extract page images at all
+        """
         self.pdf_path = pdf_path
         self.output_directory = output_directory
+        self.workers = workers
+        self.extract_images = extract_images
+
+    @traced("pdf.open")
+    def open_pages(self) -> tuple[int, Iterator[PageRecord]]:
+        """
+        Parse the PDF once, returning its page count together with an
+        iterator over its pages, like iter_pages.
+        """
+        pdf_reader = PdfReader(self.pdf_path)
+        return len(pdf_reader.pages), self._iter_pages(pdf_reader)
+
+    def iter_pages(self) -> Iterator[PageRecord]:
+        """
+        Yield a PageRecord for every page in order.
+        """
+        yield from self._iter_pages(PdfReader(self.pdf_path))
+
+    @traced("pdf.iter_pages")
+    def _iter_pages(self, pdf_reader) -> Iterator[PageRecord]:
+        page_count = len(pdf_reader.pages)
+        if self.workers <= 1:
+            yield from _iter_page_range(
+                pdf_reader, self.extract_images, self.output_directory, 0, page_count
+            )
+            return
+
+        # A few shards per worker keeps the pool busy when pages are uneven;
+        # each worker parses the PDF once, however many shards it extracts.
+        shard_size = max(1, -(-page_count // (self.workers * 4)))
+        shards = [
+            (start, min(start + shard_size, page_count))
+            for start in range(0, page_count, shard_size)
+        ]
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_open_pdf,
+            initargs=(self.pdf_path, self.extract_images, self.output_directory),
+        ) as executor:
+            for records in executor.map(_extract_page_range, shards):
+                yield from records
 
-    def extract_images_and_text(self) -> list[tuple[list[str], str]]:
+    @traced("pdf.extract_images_and_text")
+    def extract_images_and_text(self) -> list[PageRecord]:
         """
-        Extract images and text from a PDF file. Returns a list of tuples
-        where each tuple contains a list of image paths and the extracted text
-        from a page.
+        Extract images and text from a PDF file. Returns a list of page records
+        where each record contains a list of decoded images and the extracted
+        text from a page.
         """
         page_data = []
         try:
-            doc = PdfDocument()
-            doc.LoadFromFile(self.pdf_path)
-            pdf_reader = PdfReader(self.pdf_path)
-            image_helper = PdfImageHelper()
-
-            for i in range(doc.Pages.Count):
-                page = doc.Pages.get_Item(i)
-                images_info = image_helper.GetImagesInfo(page)
-                extracted_text = pdf_reader.pages[i].extract_text()
-                image_paths = []
-
-                for j, image_info in enumerate(images_info):
-                    image_file_name = os.path.join(
-                        self.output_directory, f"Image-{i}-{j}.png"
-                    )
-                    image_info.Image.Save(image_file_name)
-                    image_paths.append(image_file_name)
-
-                page_data.append((image_paths, extracted_text))
-
-            doc.Close()
+            page_data.extend(self.iter_pages())
         except Exception as e:
             print(f"Error extracting images and text: {e}")
         return page_data
@@ -1,16 +1,307 @@
-import sounddevice as sd
-from scipy.io.wavfile import write
-import tempfile
-import requests
+import io
 import os
-import dotenv
+import wave
+import hashlib
+import tempfile
+import threading
 import warnings
+from collections import OrderedDict
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextvars import copy_context
+from functools import lru_cache
+import dotenv
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.resources import get_resource
+from utils.tracing import span, traced
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 dotenv.load_dotenv()
 
 API_URL = os.getenv("HUGGINGFACE_URL_MODEL")
 headers = {"Authorization": f"Bearer {os.getenv('HUGGINGFACE_API')}"}
+# Recordings longer than this are split at silence and the segments are
+# transcribed concurrently by up to TRANSCRIBE_WORKERS requests.
+TRANSCRIBE_SEGMENT_SECONDS = float(os.getenv("TRANSCRIBE_SEGMENT_SECONDS", "20"))
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "4"))
+TRANSCRIBE_TIMEOUT = float(os.getenv("TRANSCRIBE_TIMEOUT", "60"))
+TRANSCRIBE_CACHE_SIZE = int(os.getenv("TRANSCRIBE_CACHE_SIZE", "128"))
+# "http" posts to the inference endpoint, "whisper" runs faster-whisper locally.
+TRANSCRIBER_BACKEND = os.getenv("TRANSCRIBER_BACKEND", "http")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "small")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "4"))
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "ar")
+
+_transcribe_executor = ThreadPoolExecutor(
+    max_workers=TRANSCRIBE_WORKERS, thread_name_prefix="transcribe"
+)
+
+
+@lru_cache(maxsize=None)
+def http_session() -> requests.Session:
+    """
+    The process-wide session for the inference endpoint, keeping one
+    connection per transcription worker alive between requests. Retries
+    while the endpoint is rate limited or its model is still loading.
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=None,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1, pool_maxsize=TRANSCRIBE_WORKERS, max_retries=retry
+    )
+    session = requests.Session()
+    session.headers.update(headers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def audio_key(audio) -> str:
+    return hashlib.sha256(audio).hexdigest()
+
+
+class TranscriptionCache:
+    """LRU cache of transcriptions keyed by the hash of the audio bytes."""
+
+    def __init__(self, max_entries=TRANSCRIBE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key, text) -> None:
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+transcription_cache = TranscriptionCache()
+
+
+def split_at_silence(audio, max_seconds=TRANSCRIBE_SEGMENT_SECONDS, window=0.03):
+    """
+    Split a 16-bit WAV recording into WAV segments of at most max_seconds,
+    cutting each one at the quietest moment of its second half, so words
+    aren't cut in two. Audio that isn't 16-bit WAV is returned whole.
+    """
+    try:
+        with wave.open(io.BytesIO(audio), "rb") as wav:
+            params = wav.getparams()
+            frames = wav.readframes(params.nframes)
+    except (wave.Error, EOFError):
+        return [audio]
+    if params.sampwidth != 2 or params.nframes <= max_seconds * params.framerate:
+        return [audio]
+    import numpy as np
+
+    samples = np.frombuffer(frames, dtype="<i2").reshape(-1, params.nchannels)
+    samples = samples.astype(np.float32).mean(axis=1)
+    # RMS loudness of consecutive windows.
+    window_frames = max(1, int(window * params.framerate))
+    n_windows = len(samples) // window_frames
+    loudness = np.sqrt(
+        np.mean(
+            samples[: n_windows * window_frames].reshape(n_windows, -1) ** 2, axis=1
+        )
+    )
+    max_windows = max(2, int(max_seconds * params.framerate) // window_frames)
+
+    cuts = [0]
+    while n_windows - cuts[-1] > max_windows:
+        start = cuts[-1] + max_windows // 2
+        quietest = start + int(np.argmin(loudness[start : cuts[-1] + max_windows]))
+        cuts.append(quietest)
+    bounds = [cut * window_frames for cut in cuts] + [params.nframes]
+
+    frame_size = params.sampwidth * params.nchannels
+    segments = []
+    for begin, end in zip(bounds, bounds[1:]):
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setparams(params)
+            wav.writeframes(frames[begin * frame_size : end * frame_size])
+        segments.append(buffer.getvalue())
+    return segments
+
+
+class HTTPTranscriberBackend:
+    """Transcribes over the Hugging Face inference endpoint."""
+
+    name = "http"
+
+    def __init__(self, api_url=API_URL):
+        self.api_url = api_url
+
+    def transcribe(self, audio):
+        """The text of a WAV recording, or None if the request failed."""
+        try:
+            response = http_session().post(
+                self.api_url, data=audio, timeout=TRANSCRIBE_TIMEOUT
+            )
+            if response.status_code != 200:
+                print(f"Error during transcription: {response.status_code}")
+                return None
+            return response.json().get("text", "")
+        except (requests.RequestException, ValueError, AttributeError) as e:
+            # ValueError: the body isn't JSON; AttributeError: it isn't an object.
+            print(f"Error during transcription: {e}")
+            return None
+
+
+class LocalWhisperBackend:
+    """
+    Transcribes on the CPU with a quantized faster-whisper model, which is
+    loaded once in a worker process that stays up between questions. The
+    model starts loading when the backend is created, so the first
+    question doesn't wait for it as long.
+    """
+
+    def __init__(
+        self,
+        model_size=WHISPER_MODEL,
+        compute_type=WHISPER_COMPUTE_TYPE,
+        cpu_threads=WHISPER_CPU_THREADS,
+        language=WHISPER_LANGUAGE,
+        timeout=TRANSCRIBE_TIMEOUT,
+    ):
+        if not whisper_available():
+            raise ImportError(WHISPER_MISSING)
+        self.name = f"whisper:{model_size}:{compute_type}"
+        self.model_args = (model_size, compute_type, cpu_threads)
+        self.language = language
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self) -> None:
+        # Spawned, since forking the threaded Streamlit server isn't safe.
+        self._executor = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._ready = self._executor.submit(_load_whisper_model, *self.model_args)
+
+    def wait_until_ready(self, timeout=None) -> None:
+        """Block until the worker has loaded the model, raising if it couldn't."""
+        self._ready.result(timeout)
+
+    def transcribe(self, audio):
+        """
+        The text of a WAV recording, or None if transcribing failed or took
+        longer than timeout seconds.
+        """
+        with self._lock:
+            executor, ready = self._executor, self._ready
+        try:
+            return executor.submit(
+                _whisper_transcribe, audio, self.language, self.model_args
+            ).result(self.timeout)
+        except FutureTimeoutError:
+            if not ready.done():
+                # Still loading the model, which later questions will use.
+                print("Error during transcription: the model is still loading.")
+            else:
+                print("Error during transcription: timed out, restarting the worker.")
+                self._restart(executor)
+            return None
+        except BrokenProcessPool as e:
+            print(f"Error during transcription, restarting the worker: {e}")
+            self._restart(executor)
+            return None
+        except Exception as e:
+            print(f"Error during transcription: {e}")
+            return None
+
+    def _restart(self, executor) -> None:
+        """Replace a broken or stuck worker, unless another thread already did."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._start()
+        # A stuck worker wouldn't exit on shutdown, so it's terminated.
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(cancel_futures=True)
+
+
+WHISPER_MISSING = "The whisper transcriber backend needs `pip install faster-whisper`."
+
+
+@lru_cache(maxsize=None)
+def whisper_available() -> bool:
+    """Whether faster-whisper is installed, checked once per process."""
+    return importlib.util.find_spec("faster_whisper") is not None
+
+
+def transcriber_backend_warning(name=TRANSCRIBER_BACKEND):
+    """Why the configured backend can't be used, if it falls back to HTTP."""
+    if name == "whisper" and not whisper_available():
+        return f"{WHISPER_MISSING} Transcribing with the inference API instead."
+    return None
+
+
+def get_transcriber_backend(name=TRANSCRIBER_BACKEND):
+    """
+    The process-wide transcriber backend called name, "http" or "whisper".
+    Without faster-whisper installed, "whisper" falls back to "http".
+    """
+    if transcriber_backend_warning(name) is not None:
+        name = "http"
+    if name == "http":
+        return get_resource("transcriber_backend:http", HTTPTranscriberBackend)
+    if name == "whisper":
+        return get_resource(
+            f"transcriber_backend:whisper:{WHISPER_MODEL}", LocalWhisperBackend
+        )
+    raise ValueError(f"Unknown transcriber backend: {name}")
+
+
+# Run in the whisper worker process. The model is loaded by the first task
+# rather than a pool initializer, so if loading fails the error reaches the
+# caller and the next task tries again, instead of the pool breaking.
+@lru_cache(maxsize=1)
+def _whisper_model(model_size, compute_type, cpu_threads):
+    from faster_whisper import WhisperModel
+
+    return WhisperModel(
+        model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads
+    )
+
+
+def _load_whisper_model(model_size, compute_type, cpu_threads) -> None:
+    _whisper_model(model_size, compute_type, cpu_threads)
+
+
+def _whisper_transcribe(audio, language, model_args) -> str:
+    # faster-whisper decodes the WAV and resamples it to 16 kHz itself.
+    segments, _ = _whisper_model(*model_args).transcribe(
+        io.BytesIO(audio), language=language, beam_size=1
+    )
+    return "".join(segment.text for segment in segments).strip()
 
 
 class AudioRecorder:
@@ -24,6 +315,9 @@ class AudioRecorder:
 
     def record_audio(self) -> bytes:
         """Record audio from the microphone."""
+        # Imported here so transcribing doesn't load the audio device libraries.
+        import sounddevice as sd
+
         print("Recording... Press Ctrl+C to stop.")
         try:
             audio = sd.rec(
@@ -41,6 +335,8 @@ class AudioRecorder:
 
     def save_audio(self, audio) -> str:
         """Save the recorded audio to a temporary file."""
+        from scipy.io.wavfile import write
+
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_audio:
             write(temp_audio.name, self.fs, audio)
             return temp_audio.name
@@ -48,16 +344,46 @@ class AudioRecorder:
 
 class AudioTranscriber:
     """
-    Class to transcribe audio using the Hugging Face API.
+    Class to transcribe audio with a transcriber backend, by default the one
+    selected by TRANSCRIBER_BACKEND.
     """
 
-    def transcribe_audio(self, audio_path) -> str:
-        """Transcribe audio using the Hugging Face API."""
-        with open(audio_path, "rb") as f:
-            data = f.read()
-        response = requests.post(API_URL, headers=headers, data=data)
-        if response.status_code == 200:
-            return response.json().get("text", "")
-        else:
-            print(f"Error during transcription: {response.status_code}")
+    def __init__(self, backend=None, cache=transcription_cache):
+        self.backend = backend or get_transcriber_backend()
+        self.cache = cache
+
+    @traced("audio.transcribe")
+    def transcribe_audio(self, audio) -> str:
+        """
+        Transcribe a recording, given as WAV bytes or the path of an audio
+        file. Returns "" if any segment fails, rather than a partial question.
+        """
+        if isinstance(audio, (str, os.PathLike)):
+            with open(audio, "rb") as f:
+                audio = f.read()
+        # Backends transcribe the same audio differently.
+        key = f"{self.backend.name}:{audio_key(audio)}"
+        text = self.cache.get(key)
+        if text is not None:
+            return text
+
+        segments = split_at_silence(audio)
+        # Run in copies of this context, so the segment spans nest under this one.
+        futures = [
+            _transcribe_executor.submit(
+                copy_context().run, self._transcribe_segment, segment
+            )
+            for segment in segments
+        ]
+        texts = [future.result() for future in futures]
+        if any(text is None for text in texts):
             return ""
+        text = " ".join(text.strip() for text in texts if text.strip())
+        self.cache.put(key, text)
+        return text
+
+    def _transcribe_segment(self, segment):
+        with span(
+            "audio.transcribe_segment", backend=self.backend.name, bytes=len(segment)
+        ):
+            return self.backend.transcribe(segment)
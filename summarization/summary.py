@@ -1,17 +1,45 @@
 import os
-import google.generativeai as genai
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import dotenv
-import textwrap
-from IPython.display import Markdown
+from summarization.summary_cache import default_summary_cache, summary_key
+from utils.tracing import traced
 
 dotenv.load_dotenv()
 
-genai.configure(api_key=os.environ["GOOGLE_API_KEY_SUMMARIZATION"])
+
+@lru_cache(maxsize=None)
+def configure_genai():
+    """Import and configure the Gemini client once, when it's first needed."""
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.environ["GOOGLE_API_KEY_SUMMARIZATION"])
+    return genai
+
+
+# Bump whenever the prompt changes, so cached summaries are regenerated.
+PROMPT_VERSION = 1
+SUMMARY_PROMPT = """
+            - يرجى تلخيص محتوى ملف PDF المرفق باللغة العربية. يجب أن يكون الملخص موجزا ويغطي النقاط الرئيسية في الوثيقة.
+            - لازم ترد بالعربي فقط.
+            """
+MAP_PROMPT = """
+            - يرجى تلخيص الجزء التالي من وثيقة باللغة العربية. يجب أن يكون الملخص موجزا ويغطي النقاط الرئيسية فيه.
+            - لازم ترد بالعربي فقط.
+            """
+REDUCE_PROMPT = """
+            - فيما يلي ملخصات لأجزاء متتالية من نفس الوثيقة. يرجى دمجها في ملخص واحد موجز باللغة العربية يغطي النقاط الرئيسية في الوثيقة.
+            - لازم ترد بالعربي فقط.
+            """
 
 
 class FileSummarizer:
-    def __init__(self, model_name="gemini-1.5-flash"):
-        self.model = genai.GenerativeModel(model_name)
+    def __init__(self, model_name="gemini-1.5-flash", model=None, cache=None):
+        self.model_name = model_name
+        if model is None:
+            model = configure_genai().GenerativeModel(model_name)
+        self.model = model
+        self.cache = cache or default_summary_cache()
 
     def to_markdown(self, text: str) -> str:
         """Convert text to markdown format."""
@@ -19,16 +47,77 @@ class FileSummarizer:
         # indented_text = textwrap.indent(text, "> ", predicate=lambda _: True)
         return f"```markdown\n{text}\n```"
 
+    @traced("summary.upload_file")
+    def upload_file(self, pdf_path):
+        return configure_genai().upload_file(pdf_path)
+
+    @traced("summary.upload_and_summarize")
     def upload_and_summarize(self, pdf_path):
-        """Upload PDF, generate a summary in Arabic, and print the summary."""
+        """
+        Upload PDF, generate a summary in Arabic, and return the summary.
+        Summaries are cached by PDF content, model and prompt version. Errors
+        are logged and raised.
+        """
         try:
-            pdf_file = genai.upload_file(pdf_path)
-            prompt = """
-            - يرجى تلخيص محتوى ملف PDF المرفق باللغة العربية. يجب أن يكون الملخص موجزا ويغطي النقاط الرئيسية في الوثيقة.
-            - لازم ترد بالعربي فقط.
-            """
-            response = self.model.generate_content([prompt, pdf_file])
-            text = self.to_markdown(response.text)
+            with open(pdf_path, "rb") as f:
+                key = summary_key(f.read(), self.model_name, PROMPT_VERSION)
+            # Concurrent requests for the same document wait for the first one.
+            with self.cache.key_lock(key):
+                text = self.cache.get(key)
+                if text is None:
+                    pdf_file = self.upload_file(pdf_path)
+                    response = self.model.generate_content([SUMMARY_PROMPT, pdf_file])
+                    text = self.to_markdown(response.text)
+                    self.cache.put(key, text)
             return text
         except Exception as e:
             print(f"Error summarizing file: {e}")
+            raise
+
+    @traced("summary.summarize_text")
+    def _summarize_text(self, prompt, text) -> str:
+        """Summarize text with prompt, caching the result by their hash."""
+        key = summary_key(
+            (prompt + text).encode("utf-8"), self.model_name, PROMPT_VERSION
+        )
+        with self.cache.key_lock(key):
+            summary = self.cache.get(key)
+            if summary is None:
+                summary = self.model.generate_content([prompt, text]).text
+                self.cache.put(key, summary)
+        return summary
+
+    @traced("summary.summarize_chunks")
+    def summarize_chunks(
+        self, text_chunks, group_size=20, reduce_fanout=8, max_workers=4
+    ):
+        """
+        Map-reduce summary of a document too large for one request: summarize
+        groups of group_size chunks concurrently, then merge the partial
+        summaries reduce_fanout at a time until one summary is left. Errors
+        are logged and raised.
+        """
+        try:
+            texts = [
+                "\n".join(doc.page_content for doc in text_chunks[i : i + group_size])
+                for i in range(0, len(text_chunks), group_size)
+            ]
+            prompt = MAP_PROMPT
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                while True:
+                    summaries = list(
+                        executor.map(
+                            lambda text: self._summarize_text(prompt, text), texts
+                        )
+                    )
+                    if len(summaries) <= 1:
+                        break
+                    texts = [
+                        "\n\n".join(summaries[i : i + reduce_fanout])
+                        for i in range(0, len(summaries), reduce_fanout)
+                    ]
+                    prompt = REDUCE_PROMPT
+            return self.to_markdown(summaries[0]) if summaries else None
+        except Exception as e:
+            print(f"Error summarizing chunks: {e}")
+            raise
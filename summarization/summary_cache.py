@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+import dotenv
+
+dotenv.load_dotenv()
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "summary_cache.sqlite")
+
+
+def summary_key(content, model_name, prompt_version) -> str:
+    """Hash the summarized content together with the model and prompt version."""
+    digest = hashlib.sha256(content)
+    digest.update(f"|{model_name}|{prompt_version}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """
+    Persistent SQLite cache of summaries. key_lock(key) lets callers make
+    sure a summary is computed at most once, even across sessions.
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # key -> (lock, number of threads holding or waiting for it)
+        self._key_locks = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries "
+            "(key TEXT PRIMARY KEY, summary TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, summary) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?)", (key, summary)
+            )
+            self._conn.commit()
+
+    @contextmanager
+    def key_lock(self, key):
+        """
+        Hold the lock of key for the with block. A key's lock is dropped once
+        no thread holds or waits for it, so only keys in use take memory.
+        """
+        with self._lock:
+            lock, users = self._key_locks.get(key, (None, 0))
+            if lock is None:
+                lock = threading.Lock()
+            self._key_locks[key] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                users = self._key_locks[key][1] - 1
+                if users:
+                    self._key_locks[key] = (lock, users)
+                else:
+                    del self._key_locks[key]
+
+
+@lru_cache(maxsize=None)
+def default_summary_cache() -> SummaryCache:
+    """The process-wide summary cache, opened on first use."""
+    return SummaryCache()
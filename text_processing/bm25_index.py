@@ -0,0 +1,104 @@
+import math
+from array import array
+from collections import Counter, defaultdict
+import numpy as np
+
+from langchain_core.documents import Document
+from text_processing.preprocessing import preprocess
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over preprocessed chunks. Queries are
+    preprocessed the same way, so exact Arabic terms, names and numbers
+    match without an embedding call. Postings are kept in typed arrays, so
+    a term's BM25 scores are computed as one numpy vector, cached until more
+    chunks are added, and a query sums its terms' vectors.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents = []
+        # term -> (chunk positions, term frequencies)
+        self.postings = defaultdict(lambda: (array("i"), array("i")))
+        self.doc_lengths = array("i")
+        self._total_length = 0
+        # Scores depend on every chunk's length, so adding chunks resets them.
+        self._weights = {}
+        self._length_norms = None
+
+    def add_documents(self, documents) -> None:
+        """Index documents whose page_content is already preprocessed."""
+        for doc in documents:
+            doc_id = len(self.documents)
+            terms = doc.page_content.split()
+            self.documents.append(doc)
+            self.doc_lengths.append(len(terms))
+            self._total_length += len(terms)
+            for term, frequency in Counter(terms).items():
+                doc_ids, frequencies = self.postings[term]
+                doc_ids.append(doc_id)
+                frequencies.append(frequency)
+        self._weights = {}
+        self._length_norms = None
+
+    def search(self, query, k=9) -> list[Document]:
+        """Return the k best matching chunks, best first."""
+        return [self.documents[doc_id] for doc_id, _ in self.scores(query, k)]
+
+    def scores(self, query, k=9) -> list[tuple[int, float]]:
+        """Return (chunk position, score) pairs for the k best matches."""
+        n_docs = len(self.documents)
+        if not n_docs:
+            return []
+        scores = np.zeros(n_docs)
+        for term in set(preprocess(query).split()):
+            weights = self._term_weights(term)
+            if weights is not None:
+                doc_ids, term_scores = weights
+                scores[doc_ids] += term_scores
+        matches = np.flatnonzero(scores)
+        if len(matches) > k:
+            matches = matches[np.argpartition(scores[matches], -k)[-k:]]
+        best = matches[np.argsort(-scores[matches], kind="stable")]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in best]
+
+    def _term_weights(self, term):
+        """(chunk positions, BM25 scores) of the chunks containing term."""
+        weights = self._weights.get(term)
+        if weights is not None:
+            return weights
+        postings = self.postings.get(term)
+        if not postings:
+            return None
+        n_docs = len(self.documents)
+        if self._length_norms is None:
+            lengths = np.frombuffer(self.doc_lengths, dtype=np.intc)
+            length_ratios = lengths / (self._total_length / n_docs)
+            self._length_norms = self.k1 * (1 - self.b + self.b * length_ratios)
+        # Copied, since the arrays can't grow while numpy views of them exist.
+        doc_ids = np.frombuffer(postings[0], dtype=np.intc).copy()
+        frequencies = np.frombuffer(postings[1], dtype=np.intc).astype(np.float64)
+        idf = math.log(1 + (n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+        term_scores = (
+            idf
+            * frequencies
+            * (self.k1 + 1)
+            / (frequencies + self._length_norms[doc_ids])
+        )
+        weights = self._weights[term] = (doc_ids, term_scores)
+        return weights
+
+
+def reciprocal_rank_fusion(result_lists, k=9, rrf_k=60) -> list[Document]:
+    """Fuse ranked lists of chunks, scoring each by its sum of 1 / (rrf_k + rank)."""
+    scores = defaultdict(float)
+    documents = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            key = (doc.page_content, doc.metadata.get("page"))
+            scores[key] += 1 / (rrf_k + rank + 1)
+            documents.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ranked[:k]]
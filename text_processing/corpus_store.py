@@ -0,0 +1,148 @@
+import os
+import json
+import threading
+import dotenv
+import faiss
+import numpy as np
+
+from langchain_core.documents import Document
+from chatbot.vector_store_cache import vector_store_cache
+from text_processing.faiss_index_factory import search_selected
+
+dotenv.load_dotenv()
+CORPUS_MANIFEST_PATH = os.getenv("CORPUS_MANIFEST_PATH", "corpus.json")
+
+
+class CorpusStore:
+    """
+    Searches across every indexed document. Each document keeps its own index
+    in the IndexStore, loaded through the vector store cache when searched,
+    so the corpus holds no vectors of its own: adding or deleting a document
+    only updates the persisted list of documents, with the page of each
+    chunk, and searches stay within the cache's memory budget.
+
+    Searches limited to a page range are restricted to the matching chunks
+    inside faiss, so small ranges of large documents still find k results.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        index_store,
+        manifest_path=CORPUS_MANIFEST_PATH,
+        cache=vector_store_cache,
+    ):
+        self.embeddings = embeddings
+        self.index_store = index_store
+        self.manifest_path = manifest_path
+        self.cache = cache
+        self.lock = threading.RLock()
+        self.documents = {}
+
+    def restore(self) -> None:
+        """Re-add the documents listed in the manifest that are still stored."""
+        if not os.path.isfile(self.manifest_path):
+            return
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        with self.lock:
+            self.documents = {
+                doc_id: entry
+                for doc_id, entry in manifest.items()
+                # Entries from before pages were recorded are re-added on upload.
+                if "pages" in entry and self.index_store.exists(doc_id)
+            }
+            self._save_manifest()
+
+    def has_document(self, doc_id) -> bool:
+        return doc_id in self.documents
+
+    def add_document(self, doc_id, text_chunks, title=None) -> None:
+        """Add a stored document, given its chunks in index order."""
+        if self.has_document(doc_id) or not text_chunks:
+            return
+        pages = [chunk.metadata.get("page", -1) for chunk in text_chunks]
+        with self.lock:
+            self.documents[doc_id] = {
+                "title": title,
+                "chunks": len(pages),
+                "pages": pages,
+            }
+            self._save_manifest()
+
+    def delete_document(self, doc_id) -> None:
+        """Stop searching a document. Its index stays in the IndexStore."""
+        with self.lock:
+            if self.documents.pop(doc_id, None) is not None:
+                self._save_manifest()
+
+    def search(self, query, k=9, doc_ids=None, page_range=None) -> list[Document]:
+        """
+        Search the corpus, optionally only within doc_ids and a (first, last)
+        page range, 0-based and inclusive, like the page metadata.
+        """
+        with self.lock:
+            entries = {
+                doc_id: self.documents[doc_id]
+                for doc_id in (self.documents if doc_ids is None else doc_ids)
+                if doc_id in self.documents
+            }
+        if not entries:
+            return []
+        vector = np.array([self.embeddings.embed_query(query)], dtype=np.float32)
+
+        hits = []
+        for doc_id, entry in entries.items():
+            vector_store = self._load(doc_id)
+            if vector_store is None:
+                continue
+            if page_range is None:
+                distances, positions = vector_store.index.search(vector, k)
+            else:
+                pages = np.array(entry["pages"])
+                selected = np.flatnonzero(
+                    (pages >= page_range[0]) & (pages <= page_range[1])
+                )
+                if not len(selected):
+                    continue
+                selector = faiss.IDSelectorBatch(selected.astype(np.int64))
+                distances, positions = search_selected(
+                    vector_store.index, vector, k, selector
+                )
+            hits.extend(
+                (distance, doc_id, vector_store, int(position))
+                for distance, position in zip(distances[0], positions[0])
+                if position != -1
+            )
+
+        hits.sort(key=lambda hit: hit[0])
+        results = []
+        for _, doc_id, vector_store, position in hits[:k]:
+            doc = vector_store.docstore.search(
+                vector_store.index_to_docstore_id[position]
+            )
+            results.append(
+                Document(doc.page_content, metadata={**doc.metadata, "doc_id": doc_id})
+            )
+        return results
+
+    def _load(self, doc_id):
+        """The document's vector store, from the cache or the IndexStore."""
+        index_path = self.index_store.index_path(doc_id)
+        vector_store = self.cache.get(index_path)
+        if vector_store is not None:
+            self.index_store.touch(doc_id)
+            return vector_store
+        vector_store = self.index_store.load(doc_id, self.embeddings)
+        if vector_store is None:
+            # Evicted from the IndexStore since it was added.
+            self.delete_document(doc_id)
+            return None
+        self.cache.put(index_path, vector_store)
+        return vector_store
+
+    def _save_manifest(self) -> None:
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.documents, f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,124 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+import dotenv
+
+from langchain_core.embeddings import Embeddings
+
+dotenv.load_dotenv()
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+
+
+def text_hash(text) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent SQLite cache of embedding vectors keyed by (model name, text hash).
+    Vectors are stored as float32 blobs.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model, hashes) -> dict[str, list[float]]:
+        """Return the cached vectors for the given hashes that are present."""
+        found = {}
+        hashes = list(hashes)
+        with self._lock:
+            # Stay well under SQLite's limit on bound parameters.
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    "SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                )
+                for hash_, blob in rows:
+                    found[hash_] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model, items) -> None:
+        """Store (text hash, vector) pairs for a model."""
+        rows = [(model, hash_, array("f", vector).tobytes()) for hash_, vector in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings model so that only texts missing from the cache are
+    embedded, in batches of batch_size with at most max_concurrency requests
+    in flight.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        cache=None,
+        batch_size=EMBEDDING_BATCH_SIZE,
+        max_concurrency=EMBEDDING_MAX_CONCURRENCY,
+    ):
+        self.embeddings = embeddings
+        self.cache = cache or EmbeddingCache()
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def model(self) -> str:
+        return getattr(self.embeddings, "model", type(self.embeddings).__name__)
+
+    def embed_documents(self, texts) -> list[list[float]]:
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.model, set(hashes))
+
+        missing = {}
+        for hash_, text in zip(hashes, texts):
+            if hash_ not in vectors:
+                missing.setdefault(hash_, text)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            missing_hashes = list(missing)
+            batches = [
+                missing_hashes[start : start + self.batch_size]
+                for start in range(0, len(missing_hashes), self.batch_size)
+            ]
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                results = executor.map(
+                    lambda batch: self.embeddings.embed_documents(
+                        [missing[hash_] for hash_ in batch]
+                    ),
+                    batches,
+                )
+                for batch, batch_vectors in zip(batches, results):
+                    new_items = list(zip(batch, batch_vectors))
+                    self.cache.put_many(self.model, new_items)
+                    vectors.update(new_items)
+
+        return [vectors[hash_] for hash_ in hashes]
+
+    def embed_query(self, text) -> list[float]:
+        return self.embeddings.embed_query(text)
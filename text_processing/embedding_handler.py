@@ -1,11 +1,20 @@
 import os
 import dotenv
+from typing import Iterator
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_core.documents import Document
 from text_processing.preprocessing import preprocess
+from text_processing.index_store import document_key
+from text_processing.faiss_index_factory import (
+    FAISS_INDEX_TYPE,
+    build_params,
+    convert_index,
+)
+from text_processing.mapped_index import save_mapped_index
+from pdf_processing.pdf_extractor import PDFExtractor
+from utils.tracing import traced
 import warnings
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -19,36 +28,82 @@ class EmbeddingHandler:
     Handles the creation of a vector store from text chunks.
     """
 
-    def __init__(self, embeddings):
+    def __init__(
+        self, embeddings, chunk_size=1200, chunk_overlap=40, index_type=FAISS_INDEX_TYPE
+    ):
         self.embeddings = embeddings
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.index_type = index_type
 
-    def get_text_chunks(self, pdf_path) -> list[Document]:
-        """
-        Get text chunks from a PDF file.
-        :params
-        pdf_path:
+    @property
+    def model_name(self) -> str:
+        return getattr(self.embeddings, "model", type(self.embeddings).__name__)
 
-        :return
+    @traced("embedding.document_key")
+    def document_key(self, pdf_bytes) -> str:
+        """Key identifying the index this handler would build for a PDF."""
+        return document_key(
+            pdf_bytes,
+            self.chunk_size,
+            self.chunk_overlap,
+            self.model_name,
+            self.index_type,
+            **build_params(self.index_type),
+        )
 
+    @traced("embedding.iter_text_chunks")
+    def iter_text_chunks(self, pdf_path, pages=None) -> Iterator[Document]:
         """
-        loader = PyPDFLoader(pdf_path)
+        Yield preprocessed text chunks page by page, so they can be indexed
+        while the rest of the PDF is still being extracted.
+        :params
+        pdf_path: path of the PDF, recorded as the chunks' source
+        pages: page records already extracted from the PDF, e.g. by
+            PDFExtractor.iter_pages. The PDF is parsed here only if omitted.
+        """
+        if pages is None:
+            pages = PDFExtractor(pdf_path, extract_images=False).iter_pages()
         text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1200, chunk_overlap=40
+            chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
         )
-        pages = loader.load_and_split(text_splitter)
-
-        docs = []
         for page in pages:
-            page = page.dict()
-            page_content = preprocess(page["page_content"])
-            docs.append(Document(page_content, metadata=page["metadata"]))
-        return docs
+            page_doc = Document(
+                page.text, metadata={"source": pdf_path, "page": page.page_number}
+            )
+            for chunk in text_splitter.split_documents([page_doc]):
+                chunk = chunk.dict()
+                page_content = preprocess(chunk["page_content"])
+                yield Document(page_content, metadata=chunk["metadata"])
 
-    def get_vector_store(self, text_chunks) -> None:
-        """Create a vector store from text chunks and save it locally."""
+    @traced("embedding.get_text_chunks")
+    def get_text_chunks(self, pdf_path, pages=None) -> list[Document]:
+        """
+        Get text chunks from a PDF file.
+        :params
+        pdf_path: path of the PDF, recorded as the chunks' source
+        pages: page records already extracted from the PDF, e.g. by
+            PDFExtractor.iter_pages. The PDF is parsed here only if omitted.
+
+        :return
+        preprocessed chunks with the source and page in their metadata
+        """
+        return list(self.iter_text_chunks(pdf_path, pages))
+
+    @traced("embedding.get_vector_store")
+    def get_vector_store(self, text_chunks, index_path=FAISS_INDEX_PATH) -> FAISS:
+        """
+        Create a vector store from text chunks, using an index of self.index_type
+        (see faiss_index_factory), and return it. The store is also saved to
+        index_path unless index_path is None.
+        """
         try:
             vector_store = FAISS.from_documents(text_chunks, embedding=self.embeddings)
-            vector_store.save_local(FAISS_INDEX_PATH)
+            convert_index(vector_store, self.index_type)
+            if index_path:
+                save_mapped_index(vector_store, index_path)
+            return vector_store
 
         except Exception as e:
             print(f"Error creating vector store: {e}")
+            return None
@@ -0,0 +1,125 @@
+import os
+import faiss
+import numpy as np
+import dotenv
+
+dotenv.load_dotenv()
+# One of "flat", "hnsw", "ivf" or "ivfpq".
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "256"))
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "32"))
+FAISS_PQ_BITS = int(os.getenv("FAISS_PQ_BITS", "8"))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "200"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq")
+# Vectors per IVF list faiss wants for training without warnings.
+TRAINING_POINTS_PER_LIST = 39
+
+
+def training_size(index_type=FAISS_INDEX_TYPE, nlist=FAISS_NLIST) -> int:
+    """Number of vectors worth collecting before building an index of this type."""
+    if index_type in ("ivf", "ivfpq"):
+        return nlist * TRAINING_POINTS_PER_LIST
+    return 0
+
+
+def build_params(index_type=FAISS_INDEX_TYPE) -> dict:
+    """
+    The settings that shape an index of index_type when it is built. Search
+    settings (nprobe, efSearch) are left out, since they are reapplied
+    whenever an index is loaded.
+    """
+    if index_type == "hnsw":
+        return {"hnsw_m": FAISS_HNSW_M, "ef_construction": FAISS_EF_CONSTRUCTION}
+    if index_type == "ivf":
+        return {"nlist": FAISS_NLIST}
+    if index_type == "ivfpq":
+        return {"nlist": FAISS_NLIST, "pq_m": FAISS_PQ_M, "pq_bits": FAISS_PQ_BITS}
+    return {}
+
+
+def build_faiss_index(
+    vectors,
+    index_type=FAISS_INDEX_TYPE,
+    nlist=FAISS_NLIST,
+    nprobe=FAISS_NPROBE,
+    pq_m=FAISS_PQ_M,
+    pq_bits=FAISS_PQ_BITS,
+    hnsw_m=FAISS_HNSW_M,
+    ef_construction=FAISS_EF_CONSTRUCTION,
+    ef_search=FAISS_EF_SEARCH,
+):
+    """
+    Build an index of the given type, trained on (but not containing) vectors.
+    IVF indexes use fewer lists when there aren't enough vectors to train nlist.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type: {index_type}")
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+        return index
+
+    nlist = max(1, min(nlist, n // TRAINING_POINTS_PER_LIST or n))
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivfpq" and dim % pq_m == 0 and n >= 2**pq_bits:
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_bits)
+    else:
+        # Too few vectors (or an incompatible dimension) for product quantization.
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    index.train(vectors)
+    index.nprobe = nprobe
+    return index
+
+
+def set_search_params(index, nprobe=FAISS_NPROBE, ef_search=FAISS_EF_SEARCH) -> None:
+    """Apply search-time knobs, which aren't all kept when an index is saved."""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except RuntimeError:
+        pass
+
+
+def search_selected(index, vectors, k, selector):
+    """
+    Search only the ids selector accepts. Filtered HNSW graph and IVF
+    searches miss matches that aren't near the unfiltered results, so
+    HNSW's flat storage is scanned instead and every IVF list is probed.
+    """
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=index.nlist)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return index.search(vectors, k, params=params)
+
+
+def convert_index(vector_store, index_type=FAISS_INDEX_TYPE, **params) -> None:
+    """
+    Replace the flat index of a LangChain FAISS store with one of index_type,
+    trained on and filled with the store's vectors, keeping their order.
+    """
+    if index_type == "flat":
+        return
+    flat_index = vector_store.index
+    vectors = flat_index.reconstruct_n(0, flat_index.ntotal)
+    index = build_faiss_index(vectors, index_type, **params)
+    index.add(vectors)
+    vector_store.index = index
+
+
+def index_size(index) -> int:
+    """Serialized size of an index in bytes."""
+    return faiss.serialize_index(index).nbytes
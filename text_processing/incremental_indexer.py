@@ -0,0 +1,124 @@
+import threading
+from itertools import islice
+
+from langchain_community.vectorstores import FAISS
+from text_processing.bm25_index import BM25Index
+from text_processing.embedding_cache import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_CONCURRENCY,
+)
+from text_processing.faiss_index_factory import (
+    FAISS_INDEX_TYPE,
+    convert_index,
+    training_size,
+)
+from utils.tracing import traced
+
+
+def embedding_window(embeddings) -> int:
+    """Chunks the embeddings can embed concurrently, in full batches."""
+    batch_size = getattr(embeddings, "batch_size", EMBEDDING_BATCH_SIZE)
+    max_concurrency = getattr(embeddings, "max_concurrency", EMBEDDING_MAX_CONCURRENCY)
+    return batch_size * max_concurrency
+
+
+class IncrementalIndexer:
+    """
+    Embeds a stream of text chunks in batches and adds them to a FAISS store
+    and a BM25 index as they arrive, so both can be searched while indexing
+    continues. Searches must hold self.lock, since the indexes can't be
+    searched and appended to concurrently.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        batch_size=None,
+        total_pages=None,
+        index_type=FAISS_INDEX_TYPE,
+    ):
+        self.embeddings = embeddings
+        # By default, enough chunks per embedding call to fill every request
+        # CachedEmbeddings can have in flight at once.
+        self.batch_size = batch_size or embedding_window(embeddings)
+        self.total_pages = total_pages
+        # Chunks are added to a flat index until there are enough of them to
+        # train an index of this type, which then takes over.
+        self.index_type = index_type
+        self._converted = index_type == "flat"
+        self.lock = threading.RLock()
+        self.vector_store = None
+        self.bm25 = BM25Index()
+        self.text_chunks = []
+        self.indexed_pages = 0
+        self.done = False
+        self.error = None
+        self._thread = None
+
+    @property
+    def progress(self) -> float:
+        """Fraction of pages indexed so far, between 0 and 1."""
+        if self.done:
+            return 1.0
+        if not self.total_pages:
+            return 0.0
+        return min(self.indexed_pages / self.total_pages, 1.0)
+
+    @traced("indexer.add_batch")
+    def add_batch(self, batch) -> None:
+        """Embed a batch of chunks and add it to the store."""
+        texts = [doc.page_content for doc in batch]
+        metadatas = [doc.metadata for doc in batch]
+        # Lexical search can use the batch before its embeddings come back.
+        with self.lock:
+            self.bm25.add_documents(batch)
+        # Embed outside the lock so searches only wait for the append itself.
+        vectors = self.embeddings.embed_documents(texts)
+        with self.lock:
+            if self.vector_store is None:
+                self.vector_store = FAISS.from_embeddings(
+                    zip(texts, vectors), self.embeddings, metadatas=metadatas
+                )
+            else:
+                self.vector_store.add_embeddings(
+                    zip(texts, vectors), metadatas=metadatas
+                )
+            self.text_chunks.extend(batch)
+            if self.vector_store.index.ntotal >= training_size(self.index_type):
+                self._convert_index()
+            self.indexed_pages = max(
+                self.indexed_pages, batch[-1].metadata.get("page", -1) + 1
+            )
+
+    def _convert_index(self) -> None:
+        if not self._converted:
+            convert_index(self.vector_store, self.index_type)
+            self._converted = True
+
+    def run(self, chunks, on_complete=None) -> None:
+        """Index every chunk, then call on_complete(vector_store, text_chunks)."""
+        try:
+            chunks = iter(chunks)
+            while batch := list(islice(chunks, self.batch_size)):
+                self.add_batch(batch)
+            with self.lock:
+                if self.vector_store is not None:
+                    self._convert_index()
+            if on_complete is not None and self.vector_store is not None:
+                on_complete(self.vector_store, self.text_chunks)
+        except Exception as e:
+            self.error = e
+            print(f"Error indexing chunks: {e}")
+        finally:
+            self.done = True
+
+    def start(self, chunks, on_complete=None) -> None:
+        """Run the indexing in a background thread."""
+        self._thread = threading.Thread(
+            target=self.run, args=(chunks, on_complete), daemon=True
+        )
+        self._thread.start()
+
+    def wait(self, timeout=None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,131 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import dotenv
+
+from langchain_core.documents import Document
+from text_processing.mapped_index import (
+    is_mapped_index,
+    load_mapped_index,
+    save_mapped_index,
+)
+
+dotenv.load_dotenv()
+FAISS_INDEX_PATH = os.getenv("FAISS_INDEX_PATH")
+INDEX_STORE_MAX_MB = int(os.getenv("INDEX_STORE_MAX_MB", "2048"))
+
+
+def document_key(
+    pdf_bytes, chunk_size, chunk_overlap, model_name, index_type="flat", **params
+) -> str:
+    """
+    Hash the PDF content together with everything that shapes its index:
+    the chunking, the embedding model, the index type and its build params.
+    """
+    digest = hashlib.sha256(pdf_bytes)
+    digest.update(f"|{chunk_size}|{chunk_overlap}|{model_name}".encode("utf-8"))
+    if index_type != "flat":
+        digest.update(f"|{index_type}".encode("utf-8"))
+    for name, value in sorted(params.items()):
+        digest.update(f"|{name}={value}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def chunks_from_store(vector_store) -> list[Document]:
+    """Recover the indexed chunks, in insertion order, from a vector store."""
+    return [
+        vector_store.docstore.search(doc_id)
+        for _, doc_id in sorted(vector_store.index_to_docstore_id.items())
+    ]
+
+
+class IndexStore:
+    """
+    Content-addressed store of FAISS indexes on disk, one directory per
+    document key, in the memory-mapped format of mapped_index. Least recently
+    accessed indexes are evicted once the store grows past max_bytes; callers
+    serving an index from memory instead of load() must touch() it.
+    """
+
+    def __init__(
+        self, root=FAISS_INDEX_PATH, max_bytes=INDEX_STORE_MAX_MB * 1024 * 1024
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        # Called with the key of every evicted index.
+        self.eviction_listeners = []
+        os.makedirs(self.root, exist_ok=True)
+
+    def index_path(self, key) -> str:
+        return os.path.join(self.root, key)
+
+    def exists(self, key) -> bool:
+        return is_mapped_index(self.index_path(key))
+
+    def load(self, key, embeddings):
+        """Load the index for key, or return None if it isn't stored."""
+        if not self.exists(key):
+            return None
+        try:
+            vector_store = load_mapped_index(self.index_path(key), embeddings)
+            self.touch(key)
+            return vector_store
+        except Exception as e:
+            print(f"Error loading index {key}: {e}")
+            return None
+
+    def touch(self, key) -> None:
+        """Mark the index for key as just accessed, so it's evicted last."""
+        try:
+            os.utime(self.index_path(key))
+        except OSError:
+            # Not stored (yet), or evicted meanwhile.
+            pass
+
+    def save(self, key, vector_store) -> str:
+        """Save the index for key atomically, then evict old indexes if needed."""
+        path = self.index_path(key)
+        tmp_path = tempfile.mkdtemp(prefix=f".{key}-", dir=self.root)
+        try:
+            save_mapped_index(vector_store, tmp_path)
+            if self.exists(key):
+                # Another session stored the same document first.
+                shutil.rmtree(tmp_path)
+            else:
+                # Replace any index left in the old pickled format.
+                shutil.rmtree(path, ignore_errors=True)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            print(f"Error saving index {key}: {e}")
+        self.evict(keep=key)
+        return path
+
+    def evict(self, keep=None) -> None:
+        """Remove least recently accessed indexes until the store fits max_bytes."""
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            entries.append((os.path.getmtime(path), _directory_size(path), name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(self.index_path(name), ignore_errors=True)
+            total -= size
+            for listener in self.eviction_listeners:
+                listener(name)
+
+
+def _directory_size(path) -> int:
+    return sum(
+        os.path.getsize(os.path.join(dirpath, filename))
+        for dirpath, _, filenames in os.walk(path)
+        for filename in filenames
+    )
@@ -0,0 +1,200 @@
+import os
+import time
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import dotenv
+
+from text_processing.incremental_indexer import IncrementalIndexer
+from pdf_processing.pdf_extractor import PDFExtractor
+from utils.tracing import traced
+
+dotenv.load_dotenv()
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+INGESTION_MAX_QUEUED = int(os.getenv("INGESTION_MAX_QUEUED", "16"))
+INGESTION_STATE_PATH = os.getenv("INGESTION_STATE_PATH", "ingestion_jobs.sqlite")
+
+QUEUED = "queued"
+EXTRACTING = "extracting"
+EMBEDDING = "embedding"
+READY = "ready"
+FAILED = "failed"
+
+
+class IngestionJob:
+    """
+    One document being ingested. Its indexer exists from submission, so
+    chats can search the pages indexed so far.
+    """
+
+    def __init__(self, doc_key, pdf_path, title, indexer):
+        self.doc_key = doc_key
+        self.pdf_path = pdf_path
+        self.title = title
+        self.indexer = indexer
+        self.state = QUEUED
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (READY, FAILED)
+
+
+class IngestionQueue:
+    """
+    Ingests PDFs on a bounded pool of max_workers threads, outside the
+    Streamlit script run. At most max_queued jobs wait for a worker; submit
+    raises queue.Full beyond that. Unfinished jobs are deduplicated by
+    document key, and job states are persisted to SQLite, where jobs
+    interrupted by a restart are marked failed.
+    """
+
+    def __init__(
+        self,
+        max_workers=INGESTION_WORKERS,
+        max_queued=INGESTION_MAX_QUEUED,
+        state_path=INGESTION_STATE_PATH,
+    ):
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ingestion"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._completed = 0
+        self._failed = 0
+        self._pages = 0
+        self._busy_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._conn = sqlite3.connect(state_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (doc_key TEXT PRIMARY KEY, "
+            "title TEXT, state TEXT NOT NULL, error TEXT, updated_at REAL)"
+        )
+        self._conn.execute(
+            "UPDATE jobs SET state = ?, error = ? WHERE state NOT IN (?, ?)",
+            (FAILED, "Interrupted by a restart.", READY, FAILED),
+        )
+        self._conn.commit()
+
+    def submit(self, doc_key, pdf_path, title, embedding_handler, on_complete=None):
+        """
+        Queue a document for ingestion, or return the job already ingesting
+        the same content. on_complete(vector_store, text_chunks) runs on the
+        worker once every chunk is indexed.
+        """
+        with self._lock:
+            job = self._jobs.get(doc_key)
+            if job is not None:
+                return job
+            if self._count(QUEUED) >= self.max_queued:
+                raise queue.Full("Too many documents are waiting to be ingested.")
+            indexer = IncrementalIndexer(
+                embedding_handler.embeddings, index_type=embedding_handler.index_type
+            )
+            job = IngestionJob(doc_key, pdf_path, title, indexer)
+            self._jobs[doc_key] = job
+            self._save_state(job)
+        self._executor.submit(self._run, job, embedding_handler, on_complete)
+        return job
+
+    def get(self, doc_key):
+        """The unfinished job for doc_key, if any."""
+        with self._lock:
+            return self._jobs.get(doc_key)
+
+    def persisted_state(self, doc_key):
+        """The last recorded (state, error) of a document, including past runs."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, error FROM jobs WHERE doc_key = ?", (doc_key,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def position(self, job) -> int:
+        """How many queued jobs were submitted before job, 0 once it's running."""
+        with self._lock:
+            if job.state != QUEUED:
+                return 0
+            return sum(
+                1
+                for other in self._jobs.values()
+                if other.state == QUEUED and other.submitted_at < job.submitted_at
+            )
+
+    def metrics(self) -> dict:
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "queue_depth": self._count(QUEUED),
+                "running": self._count(EXTRACTING) + self._count(EMBEDDING),
+                "completed": self._completed,
+                "failed": self._failed,
+                "pages_per_second": (
+                    self._pages / self._busy_seconds if self._busy_seconds else 0.0
+                ),
+                "mean_wait_seconds": (
+                    self._wait_seconds / finished if finished else 0.0
+                ),
+            }
+
+    @traced("ingestion.job")
+    def _run(self, job, embedding_handler, on_complete) -> None:
+        job.started_at = time.time()
+        self._set_state(job, EXTRACTING)
+        indexer = job.indexer
+        try:
+            extractor = PDFExtractor(job.pdf_path, extract_images=False)
+            indexer.total_pages, pages = extractor.open_pages()
+            chunks = embedding_handler.iter_text_chunks(job.pdf_path, pages)
+            indexer.run(self._mark_embedding(job, chunks), on_complete)
+            if indexer.error is not None:
+                raise indexer.error
+            if indexer.vector_store is None:
+                raise ValueError("No text could be extracted from the document.")
+            self._set_state(job, READY)
+        except Exception as e:
+            print(f"Error ingesting {job.title}: {e}")
+            # The indexer never ran if the PDF couldn't be opened.
+            indexer.done = True
+            self._set_state(job, FAILED, str(e))
+
+    def _mark_embedding(self, job, chunks):
+        """Pass chunks through, switching the job to EMBEDDING at the first one."""
+        for chunk in chunks:
+            if job.state == EXTRACTING:
+                self._set_state(job, EMBEDDING)
+            yield chunk
+
+    def _set_state(self, job, state, error=None) -> None:
+        with self._lock:
+            job.state = state
+            job.error = error
+            if job.finished:
+                # Finished documents are found in the IndexStore, or resubmitted.
+                self._jobs.pop(job.doc_key, None)
+                job.finished_at = time.time()
+                if state == READY:
+                    self._completed += 1
+                    self._pages += job.indexer.total_pages or 0
+                else:
+                    self._failed += 1
+                if job.started_at is not None:
+                    self._busy_seconds += job.finished_at - job.started_at
+                    self._wait_seconds += job.started_at - job.submitted_at
+            self._save_state(job)
+
+    def _save_state(self, job) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?)",
+            (job.doc_key, job.title, job.state, job.error, time.time()),
+        )
+        self._conn.commit()
+
+    def _count(self, state) -> int:
+        return sum(1 for job in self._jobs.values() if job.state == state)
@@ -0,0 +1,147 @@
+import os
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+
+import faiss
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from text_processing.faiss_index_factory import set_search_params
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+# Map the index file instead of reading it, so processes loading it share its
+# pages. IO_FLAG_MMAP_IFC (faiss >= 1.10) maps flat and HNSW vectors, and
+# IO_FLAG_MMAP maps IVF inverted lists, but IVF indexes can't be read with
+# both, so they fall back to the second set.
+MMAP_FLAG_SETS = (
+    faiss.IO_FLAG_MMAP | faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY,
+    faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+)
+
+
+class SQLiteDocstore(Docstore):
+    """
+    Docstore backed by a SQLite file, keyed by index position. Chunks are read
+    on demand, so a loaded store keeps no texts in memory and loading it runs
+    no pickle.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def search(self, search: str):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, metadata FROM chunks WHERE position = ?",
+                (int(search),),
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def delete(self, ids) -> None:
+        positions = [int(doc_id) for doc_id in ids]
+        placeholders = ", ".join("?" * len(positions))
+        with self._lock:
+            self._connection.execute(
+                f"DELETE FROM chunks WHERE position IN ({placeholders})", positions
+            )
+            self._connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+
+class PositionalIds(Mapping):
+    """index_to_docstore_id for a SQLiteDocstore: each position is its own id."""
+
+    def __init__(self, size):
+        self.size = size
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.size:
+            raise KeyError(position)
+        return str(position)
+
+    def __iter__(self):
+        return iter(range(self.size))
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def save_mapped_index(vector_store, path) -> None:
+    """
+    Save a FAISS store as a plain faiss index file plus a SQLite docstore,
+    with chunks stored by their position in the index.
+    """
+    os.makedirs(path, exist_ok=True)
+    faiss.write_index(vector_store.index, os.path.join(path, INDEX_FILE))
+
+    docstore_path = os.path.join(path, DOCSTORE_FILE)
+    if os.path.exists(docstore_path):
+        os.remove(docstore_path)
+    connection = sqlite3.connect(docstore_path)
+    try:
+        connection.execute(
+            "CREATE TABLE chunks "
+            "(position INTEGER PRIMARY KEY, content TEXT NOT NULL, metadata TEXT)"
+        )
+        connection.executemany(
+            "INSERT INTO chunks VALUES (?, ?, ?)",
+            (
+                (
+                    position,
+                    doc.page_content,
+                    json.dumps(doc.metadata, ensure_ascii=False),
+                )
+                for position, doc in _iter_chunks(vector_store)
+            ),
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def load_mapped_index(path, embeddings) -> FAISS:
+    """
+    Load a store saved by save_mapped_index. The index is memory-mapped
+    read-only, so processes loading the same index share its pages through
+    the OS page cache instead of each holding a copy of the vectors. The
+    mapped index can't be written to: copy it with faiss.clone_index before
+    adding or removing vectors.
+    """
+    index_file = os.path.join(path, INDEX_FILE)
+    for flags in MMAP_FLAG_SETS:
+        try:
+            index = faiss.read_index(index_file, flags)
+            break
+        except RuntimeError:
+            continue
+    else:
+        # No mapping supports this index type, so each process reads a copy.
+        index = faiss.read_index(index_file, faiss.IO_FLAG_READ_ONLY)
+    set_search_params(index)
+    return FAISS(
+        embeddings,
+        index,
+        SQLiteDocstore(os.path.join(path, DOCSTORE_FILE)),
+        PositionalIds(index.ntotal),
+    )
+
+
+def is_mapped_index(path) -> bool:
+    return os.path.isfile(os.path.join(path, INDEX_FILE)) and os.path.isfile(
+        os.path.join(path, DOCSTORE_FILE)
+    )
+
+
+def _iter_chunks(vector_store):
+    for position, doc_id in sorted(vector_store.index_to_docstore_id.items()):
+        yield position, vector_store.docstore.search(doc_id)
@@ -1,47 +1,90 @@
 import re
 
-arabic_diacritics = re.compile(
-    """
-                             ّ    | # Shadda
-                            -    | # Tashdid
-                             َ    | # Fatha
-                             ً    | # Tanwin Fath
-                             ُ    | # Damma
-                             ٌ    | # Tanwin Damm
-                             ِ    | # Kasra
-                             ٍ    | # Tanwin Kasr
-                             ْ    | # Sukun
-                            ـ    | # Tatwil/Kashida
-                         """,
-    re.VERBOSE,
-)
+# Shadda, Fatha, Tanwin Fath, Damma, Tanwin Damm, Kasra, Tanwin Kasr, Sukun,
+# Tatwil/Kashida, and the hyphen (left over once page markers are removed).
+arabic_diacritics = "ًٌٍَُِّْـ-"
 arabic_to_english_map = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
 
+# No replacement below is itself a key, so applying them one after another
+# equals applying them all at once, in any order.
+diacritics_map = {diacritic: "" for diacritic in arabic_diacritics}
+letters_map = {
+    "إ": "ا",
+    "أ": "ا",
+    "آ": "ا",
+    "ى": "ي",
+    "ؤ": "ء",
+    "ئ": "ء",
+    "ة": "ه",
+    "گ": "ك",
+}
 
-def preprocess(text):
-    """
-    text is an Arabic string input
+page_number_marker = re.compile(r"-\s+\d+\s+-")
+arabic_numbers = re.compile(r"[٠١٢٣٤٥٦٧٨٩]+")
 
-    the preprocessed text is returned
+
+def _collapse_whitespace(text) -> str:
+    """Same result as re.sub(r"\\s+", " ", text), without a regex scan."""
+    words = text.split()
+    if not words:
+        return " " if text else ""
+    collapsed = " ".join(words)
+    if text[0].isspace():
+        collapsed = " " + collapsed
+    if text[-1].isspace():
+        collapsed += " "
+    return collapsed
+
+
+def _reverse_arabic_number(match) -> str:
+    # Arabic numbers are extracted reversed: reverse and then translate.
+    return match.group(0)[::-1].translate(arabic_to_english_map)
+
+
+def normalize(text, diacritics=True, digits=True, letters=True, stopwords=None):
+    """
+    Normalize Arabic text. Page number markers are removed and whitespace is
+    collapsed, then optionally:
+    diacritics: remove diacritics and tatweel
+    digits: convert (reversed) Arabic-Indic numbers to western digits
+    letters: fold alef, yaa, hamza, taa marbuta and kaf variants
+    stopwords: a set of words to drop, see normalize_stopwords
     """
 
-    text = re.sub(r"-\s+\d+\s+-", "", text)
-    text = re.sub(r"\s+", " ", text)
-    text = re.sub(arabic_diacritics, "", text)
-    text = re.sub(
-        r"[٠١٢٣٤٥٦٧٨٩]+",  # Match Arabic numbers
-        lambda match: match.group(0)[::-1].translate(
-            arabic_to_english_map
-        ),  # Reverse and then translate
-        text,
+    if "-" in text:
+        text = page_number_marker.sub("", text)
+    text = _collapse_whitespace(text)
+    # Whitespace is collapsed before diacritics are removed, so the spaces
+    # around a lone diacritic both survive, as they always have.
+    if diacritics:
+        for char, replacement in diacritics_map.items():
+            text = text.replace(char, replacement)
+    if letters:
+        for char, replacement in letters_map.items():
+            text = text.replace(char, replacement)
+    if digits:
+        text = arabic_numbers.sub(_reverse_arabic_number, text)
+    if stopwords:
+        text = " ".join([word for word in text.split() if word not in stopwords])
+
+    return text
+
+
+def normalize_stopwords(words, diacritics=True, digits=True, letters=True):
+    """
+    Normalize stopwords the same way as the text they'll be matched against,
+    returning a frozenset for constant-time lookups.
+    """
+    return frozenset(
+        normalize(word, diacritics=diacritics, digits=digits, letters=letters).strip()
+        for word in words
     )
-    text = re.sub("[إأآا]", "ا", text)
-    text = re.sub("ى", "ي", text)
-    text = re.sub("ؤ", "ء", text)
-    text = re.sub("ئ", "ء", text)
-    text = re.sub("ة", "ه", text)
-    text = re.sub("گ", "ك", text)
 
-    # text = " ".join([word for word in text.split() if word not in stop_words])
 
-    return text
+def preprocess(text):
+    """
+    text is an Arabic string input
+
+    the preprocessed text is returned
+    """
+    return normalize(text)
@@ -1,29 +1,59 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pdf_processing.ocr_processor import OCRProcessor
 import warnings
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 
+def _ocr_page(images) -> tuple[list[str], float]:
+    """OCR every image of a page, returning the texts and the time it took."""
+    start = time.perf_counter()
+    image_texts = [OCRProcessor.extract_text_from_image(image) for image in images]
+    return image_texts, time.perf_counter() - start
+
+
 class TextFormatter:
-    def __init__(self, page_data):
+    def __init__(self, page_data, workers=1):
         """
         Constructor for TextFormatter class that initializes the page data
-        :param page_data: List of tuples containing image paths and extracted text for each page
+        :param page_data: Page records (or tuples) containing images and extracted text for each page,
+            e.g. the stream from PDFExtractor.iter_pages
+        :param workers: Number of processes used to OCR pages in parallel, 1 runs serially
         """
         self.page_data = page_data
+        self.workers = workers
+        self.page_timings = []
 
     def format_extracted_data(self) -> list[str]:
         """
-        Formats the extracted text and image text into a list of strings
+        Formats the extracted text and image text into a list of strings, in
+        page order. Per-page timings are recorded in self.page_timings.
         :return: List of formatted strings
         """
+        pages = list(self.page_data)
+        image_lists = [page[0] for page in pages]
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                ocr_results = list(executor.map(_ocr_page, image_lists))
+        else:
+            ocr_results = map(_ocr_page, image_lists)
+
         formatted_results = []
-        for i, (image_paths, extracted_text) in enumerate(self.page_data):
+        self.page_timings = []
+        for i, (page, (image_texts, ocr_seconds)) in enumerate(zip(pages, ocr_results)):
+            extracted_text = page[1]
             formatted_page_text = f"<pagenumber>{i + 1}</pagenumber>\n<pagecontent>{extracted_text.strip()}</pagecontent>\n"
 
-            for image_path in image_paths:
-                image_text = OCRProcessor.extract_text_from_image(image_path)
+            for image_text in image_texts:
                 formatted_page_text += f"<imagecontent>{image_text}</imagecontent>\n"
 
             formatted_results.append(formatted_page_text)
+            self.page_timings.append(
+                {
+                    "page": i + 1,
+                    "extract_seconds": getattr(page, "elapsed", None),
+                    "ocr_seconds": ocr_seconds,
+                }
+            )
         return formatted_results
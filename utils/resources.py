@@ -0,0 +1,61 @@
+import time
+import threading
+from collections import defaultdict
+
+
+class ResourceRegistry:
+    """
+    Process-wide pool of expensive objects such as model clients and chains,
+    built once per name and shared by every session and rerun. Counts how
+    often each one was built and reused, and how long building took, so the
+    reuse can be checked.
+    """
+
+    def __init__(self):
+        self._resources = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._build_locks = defaultdict(threading.Lock)
+
+    def get(self, name, factory):
+        """Return the resource called name, building it with factory() once."""
+        with self._lock:
+            if name in self._resources:
+                self._stats[name]["reuses"] += 1
+                return self._resources[name]
+            build_lock = self._build_locks[name]
+
+        # Sessions asking for the same resource wait for a single build.
+        with build_lock:
+            with self._lock:
+                if name in self._resources:
+                    self._stats[name]["reuses"] += 1
+                    return self._resources[name]
+            start = time.perf_counter()
+            resource = factory()
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self._resources[name] = resource
+                stats = self._stats.setdefault(
+                    name, {"constructions": 0, "build_seconds": 0.0, "reuses": 0}
+                )
+                stats["constructions"] += 1
+                stats["build_seconds"] += seconds
+            return resource
+
+    def discard(self, name) -> None:
+        """Drop a resource, e.g. after its client broke, so the next get rebuilds it."""
+        with self._lock:
+            self._resources.pop(name, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+resources = ResourceRegistry()
+
+
+def get_resource(name, factory):
+    """Shortcut for resources.get."""
+    return resources.get(name, factory)
@@ -0,0 +1,347 @@
+import os
+import json
+import time
+import inspect
+import logging
+import itertools
+import threading
+import functools
+from contextvars import ContextVar
+import dotenv
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    start_http_server,
+    write_to_textfile,
+)
+
+dotenv.load_dotenv()
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+# Log every finished span as a JSON line at DEBUG level.
+TRACING_LOG = os.getenv("TRACING_LOG", "0") == "1"
+# Prometheus text exposition, written to a file (for node_exporter's textfile
+# collector) and/or served over HTTP on a port, once start_metrics_export()
+# is called.
+TRACING_METRICS_PATH = os.getenv("TRACING_METRICS_PATH", "")
+TRACING_METRICS_PORT = os.getenv("TRACING_METRICS_PORT", "")
+# Only local scrapers can reach the port unless this is set, e.g. to 0.0.0.0.
+TRACING_METRICS_HOST = os.getenv("TRACING_METRICS_HOST", "127.0.0.1")
+TRACING_METRICS_INTERVAL = float(os.getenv("TRACING_METRICS_INTERVAL", "15"))
+
+# Upper bounds in seconds of the latency histogram buckets.
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+logger = logging.getLogger("nasiy.tracing")
+if TRACING_LOG:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.DEBUG)
+
+_current_span = ContextVar("current_span", default=None)
+_trace_ids = itertools.count(1)
+_export_started = False
+_export_lock = threading.Lock()
+
+
+class MetricsRegistry:
+    """
+    Per span name latency histogram and error count, kept in a Prometheus
+    registry of their own.
+    """
+
+    def __init__(self):
+        self.registry = CollectorRegistry()
+        self._seconds = Histogram(
+            "nasiy_span_seconds",
+            "Time spent in each pipeline stage.",
+            ["span"],
+            buckets=BUCKETS,
+            registry=self.registry,
+        )
+        self._errors = Counter(
+            "nasiy_span_errors",
+            "Pipeline stages that raised.",
+            ["span"],
+            registry=self.registry,
+        )
+        self._children = {}
+
+    def record(self, name, seconds, error=False) -> None:
+        children = self._children.get(name)
+        if children is None:
+            # labels() takes a lock, so each span's metrics are looked up once.
+            children = self._children.setdefault(
+                name, (self._seconds.labels(name), self._errors.labels(name))
+            )
+        children[0].observe(seconds)
+        if error:
+            children[1].inc()
+
+    def snapshot(self) -> dict:
+        """{span name: {"count", "seconds", "errors"}}"""
+        fields = {
+            "nasiy_span_seconds_count": "count",
+            "nasiy_span_seconds_sum": "seconds",
+            "nasiy_span_errors_total": "errors",
+        }
+        spans = {}
+        for family in self.registry.collect():
+            for sample in family.samples:
+                field = fields.get(sample.name)
+                if field is not None:
+                    entry = spans.setdefault(
+                        sample.labels["span"], {"count": 0, "seconds": 0.0, "errors": 0}
+                    )
+                    entry[field] = (
+                        sample.value if field == "seconds" else int(sample.value)
+                    )
+        return spans
+
+    def exposition(self) -> str:
+        """The metrics in the Prometheus text format."""
+        return generate_latest(self.registry).decode("utf-8")
+
+    def write(self, path) -> None:
+        """Write the exposition atomically, as the textfile collector expects."""
+        write_to_textfile(path, self.registry)
+
+
+metrics = MetricsRegistry()
+
+
+class Span:
+    """
+    Times a block of work as a context manager, nested under the span that is
+    active when it starts. attrs end up in the structured log line.
+    """
+
+    __slots__ = ("name", "attrs", "parent", "trace_id", "start", "_token")
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+        self.trace_id = None
+        self.start = None
+        self._token = None
+
+    def set(self, key, value) -> None:
+        self.attrs[key] = value
+
+    def begin(self) -> "Span":
+        self.parent = _current_span.get()
+        self.trace_id = (
+            self.parent.trace_id if self.parent is not None else next(_trace_ids)
+        )
+        self.start = time.perf_counter()
+        return self
+
+    def finish(self, error=None, seconds=None) -> float:
+        """Record the span, taking seconds instead of the wall time if given."""
+        wall_seconds = time.perf_counter() - self.start
+        if seconds is None:
+            seconds = wall_seconds
+        else:
+            self.attrs["wall_ms"] = round(wall_seconds * 1000, 3)
+        metrics.record(self.name, seconds, error is not None)
+        if error is not None or logger.isEnabledFor(logging.DEBUG):
+            _log_span(self, seconds, error)
+        return seconds
+
+    def __enter__(self) -> "Span":
+        self.begin()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current_span.reset(self._token)
+        self.finish(exc)
+
+
+def span(name, **attrs) -> Span:
+    """`with span("stage"):` times the block, unless tracing is disabled."""
+    return Span(name, **attrs) if TRACING_ENABLED else _NULL_SPAN
+
+
+def traced(name):
+    """
+    Decorator running every call of a function, generator or async generator
+    in a span called name. See traced_iter for how generators are timed.
+    """
+
+    def decorator(fn):
+        if not TRACING_ENABLED:
+            return fn
+
+        if inspect.isgeneratorfunction(fn):
+
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                yield from _iter_in_span(Span(name), fn(*args, **kwargs))
+
+            return generator_wrapper
+
+        if inspect.isasyncgenfunction(fn):
+
+            @functools.wraps(fn)
+            async def async_generator_wrapper(*args, **kwargs):
+                async for item in _aiter_in_span(Span(name), fn(*args, **kwargs)):
+                    yield item
+
+            return async_generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with Span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_iter(name, iterable):
+    """
+    Iterate over iterable in a span called name. The span only counts the
+    time spent producing items, not the consumer's work between them, and
+    is active only while an item is being produced. The time to the first
+    item and the wall time are logged with it.
+    """
+    if not TRACING_ENABLED:
+        return iter(iterable)
+    return _iter_in_span(Span(name), iter(iterable))
+
+
+def traced_aiter(name, iterable):
+    """Async version of traced_iter."""
+    if not TRACING_ENABLED:
+        return iterable
+    return _aiter_in_span(Span(name), iterable)
+
+
+def _iter_in_span(current, iterator):
+    current.begin()
+    busy = 0.0
+    error = None
+    try:
+        while True:
+            token = _current_span.set(current)
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                busy += time.perf_counter() - start
+                _current_span.reset(token)
+            if "first_item_ms" not in current.attrs:
+                current.attrs["first_item_ms"] = round(busy * 1000, 3)
+            yield item
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if hasattr(iterator, "close"):
+            iterator.close()
+        current.finish(error, busy)
+
+
+async def _aiter_in_span(current, iterable):
+    current.begin()
+    iterator = iterable.__aiter__()
+    busy = 0.0
+    error = None
+    try:
+        while True:
+            token = _current_span.set(current)
+            start = time.perf_counter()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                busy += time.perf_counter() - start
+                _current_span.reset(token)
+            if "first_item_ms" not in current.attrs:
+                current.attrs["first_item_ms"] = round(busy * 1000, 3)
+            yield item
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+        current.finish(error, busy)
+
+
+class _NullSpan:
+    def set(self, key, value) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _log_span(span, seconds, error) -> None:
+    entry = {
+        "span": span.name,
+        "trace": span.trace_id,
+        "parent": span.parent.name if span.parent is not None else None,
+        "ms": round(seconds * 1000, 3),
+        **span.attrs,
+    }
+    if error is not None:
+        entry["error"] = repr(error)
+        logger.warning(json.dumps(entry, ensure_ascii=False, default=str))
+    else:
+        logger.debug(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def _write_metrics_periodically(path, interval) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            metrics.write(path)
+        except OSError as e:
+            print(f"Error writing metrics to {path}: {e}")
+
+
+def _serve_metrics(host, port) -> None:
+    try:
+        start_http_server(port, addr=host, registry=metrics.registry)
+    except OSError as e:
+        # Another worker process on this machine already serves the port.
+        print(f"Error serving metrics on {host}:{port}: {e}")
+
+
+def start_metrics_export(
+    path=TRACING_METRICS_PATH,
+    port=TRACING_METRICS_PORT,
+    host=TRACING_METRICS_HOST,
+    interval=TRACING_METRICS_INTERVAL,
+) -> None:
+    """
+    Start writing the metrics to path and serving them on host:port, for
+    whichever is set. Only the first call in a process starts anything.
+    """
+    global _export_started
+    with _export_lock:
+        if _export_started or not TRACING_ENABLED:
+            return
+        _export_started = True
+    if path:
+        threading.Thread(
+            target=_write_metrics_periodically, args=(path, interval), daemon=True
+        ).start()
+    if port:
+        # prometheus_client serves the port from a daemon thread of its own.
+        _serve_metrics(host, int(port))